@@ -9,7 +9,16 @@ setup(
         'console_scripts': [
             'egghunt=math_tutor.cli.egghunt:main',
             'egghunt_leaders=math_tutor.logs.leaderboard:main',
-            'reviewfacts=math_tutor.cli.review_factfamily:review_fact_family'
+            'reviewfacts=math_tutor.cli.review_factfamily:review_facts',
+            'class_report=math_tutor.cli.class_report:main',
+            'merge_logs=math_tutor.cli.merge_logs:main',
+            'shard_logs=math_tutor.logs.shards:main',
+            'egghunt_dashboard=math_tutor.cli.dashboard:main',
+            'memory_report=math_tutor.cli.memory_report:main',
+            'item_analysis=math_tutor.cli.item_analysis:main',
+            'mixed_practice=math_tutor.cli.practice:main',
+            'worksheets=math_tutor.cli.worksheets:main',
+            'grade_answers=math_tutor.cli.grade_answers:main'
         ],
     },
     description='A package to help anyone learn math facts',
@@ -0,0 +1,109 @@
+import argparse
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+from math_tutor import metrics
+from math_tutor.logs.historian import Historian
+from math_tutor.logs.leaderboard import Leaderboard
+from math_tutor.logs.shards import iter_store_records
+
+OPERATORS = ('+', '-', 'x', '/')
+
+
+def partition_by_user(*sources: Iterable[Dict]) -> Dict[str, List[List[Dict]]]:
+    """
+    Split each record source by user in a single pass.
+
+    Returns:
+        A dict mapping each user to one list of records per source.
+    """
+    partitions = {}
+    for idx, source in enumerate(sources):
+        for entry in source:
+            user_parts = partitions.setdefault(entry['user'], [[] for _ in sources])
+            user_parts[idx].append(entry)
+    return partitions
+
+
+def student_report(job: Tuple[str, List[Dict], List[Dict]]) -> Dict:
+    """Compute the report for one student from that student's records only."""
+    user, history_entries, leaderboard_entries = job
+    history = Historian(None, history=history_entries)
+    leaderboard = Leaderboard(None, leaderboard_data=leaderboard_entries)
+
+    streak, active = leaderboard.streak(user)
+    attempts = len(history_entries)
+    correct = sum(bool(entry['correct']) for entry in history_entries)
+    return {
+        'user': user,
+        'levels': {operator: history.suggest_level(user, operator) for operator in OPERATORS},
+        'report_card': history.report_card(user),
+        'attempts': attempts,
+        'accuracy': round(correct / attempts, 3) if attempts else None,
+        'games': len(leaderboard_entries),
+        'total_feathers': sum(entry.get('feathers', 0) for entry in leaderboard_entries),
+        'streak': streak,
+        'active': 'Active' if active else ('Inactive' if active is False else '?'),
+        'personal_bests': {
+            fact_type: entry.to_dict() for fact_type, entry in leaderboard.get_personal_bests_by_fact_type(user).items()
+        },
+    }
+
+
+def build_class_report(history_file: str, leaderboard_file: str, workers: int = None) -> List[Dict]:
+    """Partition the logs by user, then compute every student's report in parallel."""
+    partitions = partition_by_user(iter_store_records(history_file), iter_store_records(leaderboard_file))
+    jobs = [(user, parts[0], parts[1]) for user, parts in sorted(partitions.items())]
+    if not jobs:
+        return []
+
+    chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(student_report, jobs, chunksize=chunksize))
+
+
+def write_json(reports: List[Dict], filename: str):
+    with open(filename, 'w') as file:
+        json.dump(reports, file, indent=4)
+
+
+def write_csv(reports: List[Dict], filename: str):
+    fact_types = sorted({fact_type for report in reports for fact_type in report['personal_bests']})
+    header = (['user', 'games', 'total_feathers', 'streak', 'active', 'attempts', 'accuracy']
+              + [f'level {operator}' for operator in OPERATORS]
+              + [f'best {fact_type}' for fact_type in fact_types])
+    with open(filename, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        for report in reports:
+            bests = report['personal_bests']
+            writer.writerow(
+                [report['user'], report['games'], report['total_feathers'], report['streak'],
+                 report['active'], report['attempts'], report['accuracy']]
+                + [report['levels'][operator] for operator in OPERATORS]
+                + [bests[fact_type]['feathers'] if fact_type in bests else '' for fact_type in fact_types])
+
+
+@metrics.session
+def main():
+    parser = argparse.ArgumentParser(description="Write a report for every student in the class.")
+    parser.add_argument('--history', default='history.json', help="History file (default: history.json)")
+    parser.add_argument('--leaderboard', default='egghunt_leaders.json', help="Leaderboard file (default: egghunt_leaders.json)")
+    parser.add_argument('--output', default='class_report', help="Output path without extension (default: class_report)")
+    parser.add_argument('--format', choices=('csv', 'json', 'both'), default='both')
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    reports = build_class_report(args.history, args.leaderboard, args.workers)
+    if args.format in ('json', 'both'):
+        write_json(reports, args.output + '.json')
+        print(f"Wrote {args.output}.json")
+    if args.format in ('csv', 'both'):
+        write_csv(reports, args.output + '.csv')
+        print(f"Wrote {args.output}.csv")
+    print(f"Reports for {len(reports)} students.")
+
+if __name__ == "__main__":
+    main()
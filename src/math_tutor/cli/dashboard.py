@@ -0,0 +1,146 @@
+import argparse
+import hashlib
+import html
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from math_tutor.logs.shards import ShardDirectory, open_leaderboard
+
+
+def file_signature(filename: str) -> Tuple:
+    """Return a cheap fingerprint (names, sizes, mtimes) that changes whenever the leaderboard does."""
+    if ShardDirectory.exists_for(filename):
+        directory = filename + '.d'
+        return tuple(sorted((entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+                            for entry in os.scandir(directory) if entry.name.endswith('.json')))
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return ()
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+class DashboardCache:
+    """
+    Precomputed dashboard responses for one leaderboard.
+
+    Every response body and its ETag is built once per version of the leaderboard
+    file, and the file is checked for changes at most once per check_interval
+    seconds, so polling screens are served straight from memory.
+    """
+    def __init__(self, filename: str, check_interval: float = 1.0):
+        self.filename = filename
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature = None
+        self._checked = 0.0
+        self._responses = {}
+
+    def get(self, path: str):
+        """Return (body, content_type, etag) for a path, or None if there is no such page."""
+        self._refresh()
+        return self._responses.get(path)
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        with self._lock:
+            if now - self._checked < self.check_interval:
+                return
+            self._checked = now
+            signature = file_signature(self.filename)
+            if signature != self._signature:
+                self._responses = self._build()
+                self._signature = signature
+
+    def _build(self) -> Dict[str, Tuple[bytes, str, str]]:
+        leaderboard = open_leaderboard(self.filename)
+        leaders = leaderboard.get_all_time_leaders()
+        streaks = [{'user': leader['user'], 'streak': leader['streak'], 'active': leader['active']} for leader in leaders]
+        fact_types = sorted({entry.fact_type or 'N/A' for entry in leaderboard.leaderboard_data})
+        bests = {fact_type: [entry.to_dict() for entry in leaderboard.top(10, fact_type=fact_type)] for fact_type in fact_types}
+
+        pages = {
+            '/api/leaders': (json.dumps(leaders, indent=4), 'application/json'),
+            '/api/streaks': (json.dumps(streaks, indent=4), 'application/json'),
+            '/api/bests': (json.dumps(bests, indent=4), 'application/json'),
+            '/': (self._render_html(leaders, bests), 'text/html; charset=utf-8'),
+        }
+        responses = {}
+        for path, (text, content_type) in pages.items():
+            body = text.encode('utf-8')
+            responses[path] = (body, content_type, '"' + hashlib.sha1(body).hexdigest() + '"')
+        return responses
+
+    @staticmethod
+    def _render_html(leaders, bests) -> str:
+        def table(headers, rows):
+            head = ''.join(f'<th>{html.escape(str(header))}</th>' for header in headers)
+            body = ''.join('<tr>' + ''.join(f'<td>{html.escape(str(cell))}</td>' for cell in row) + '</tr>' for row in rows)
+            return f'<table><tr>{head}</tr>{body}</table>'
+
+        sections = ['<h2>All-Time Leaders</h2>', table(
+            ('Rank', 'User', 'Total Points', 'Streak', 'Status'),
+            [(rank, leader['user'], leader['total_points'], leader['streak'], leader['active'])
+             for rank, leader in enumerate(leaders, start=1)])]
+        for fact_type, entries in bests.items():
+            sections.append(f'<h2>Best Games: {html.escape(fact_type)}</h2>')
+            sections.append(table(
+                ('User', 'Feathers', 'Level', 'Timestamp'),
+                [(entry['user'], entry['feathers'], entry['level'], entry.get('timestamp', 'N/A')) for entry in entries]))
+        return ('<!DOCTYPE html><html><head><meta charset="utf-8"><meta http-equiv="refresh" content="30">'
+                '<title>Egg Hunt Leaderboard</title>'
+                '<style>body{font-family:sans-serif} td,th{padding:4px 12px;text-align:left}</style></head>'
+                '<body><h1>Egg Hunt Leaderboard</h1>' + ''.join(sections) + '</body></html>')
+
+
+def make_handler(cache: DashboardCache):
+    class DashboardHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            response = cache.get(self.path.split('?')[0])
+            if response is None:
+                self.send_error(404)
+                return
+            body, content_type, etag = response
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Polling screens would flood the console
+
+    return DashboardHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the egg hunt leaderboard for classroom screens.")
+    parser.add_argument('--leaderboard', default='egghunt_leaders.json', help="Leaderboard file (default: egghunt_leaders.json)")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    cache = DashboardCache(args.leaderboard)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(cache))
+    print(f"Serving the leaderboard on http://{args.host}:{args.port}/ (JSON under /api/leaders, /api/streaks, /api/bests)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nGoodbye!")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,41 @@
 import time
+from math_tutor import metrics
 from math_tutor.cli import egghunt_banner
 from math_tutor.core.mathfacts import MathFact
 from math_tutor.core.factlibrary import MultiplicationFactLibrary, AdditionFactLibrary, SubtractionFactLibrary, DivisionFactLibrary
-from math_tutor.logs.leaderboard import Leaderboard
-from math_tutor.logs.historian import Historian
+from math_tutor.core.relations import FactRelations
+from math_tutor.logs.shards import open_historian, open_leaderboard
 from math_tutor.cli.utils import UserChoiceList, UserChoiceDict, count_down
+from math_tutor.utils import prefetch
 
-leaderboard = Leaderboard("egghunt_leaders.json")
-history = Historian("history.json")
+leaderboard = open_leaderboard("egghunt_leaders.json", snapshot=True)
+history = open_historian("history.json", snapshot=True)
+ROUNDS = 10
 
+
+def iter_rounds(fact_library, max_operand: int, rounds: int = ROUNDS):
+    """Yield (basket, bad_egg) for each round of a game."""
+    for i in range(rounds):
+        with metrics.timer('egghunt.basket'):
+            j = 0
+            while True:
+                j += 1
+                basket_family = fact_library.sample(1).fact_library[0]
+                if basket_family.len > 1:
+                    break
+                elif j > 1000:
+                    raise ValueError("Sampled library doesn't contain a fact family with more than one fact. Please increase your max operand.")
+            metrics.count('egghunt.basket_resamples', j - 1)
+            # The bad egg's answer creeps closer to the basket's as the game goes on
+            distractor = fact_library.distractor_family(basket_family.value, max_distance=max(1, max_operand - i))
+            basket = basket_family.sample(4)
+            bad_egg = fact_library.fact_family(distractor).sample_fact(1)
+            basket.append(bad_egg)
+            basket.shuffle()
+        yield basket, bad_egg
+
+
+@metrics.session
 def main():
     egghunt_banner()
 
@@ -19,10 +46,12 @@ def main():
     if user == 'New User!':
         user = input("\nWhat's your name? ").title()
 
-    if len(history.challenge_problems(user)) > 0:
+    challenge_problems = history.challenge_problems(user)
+    if len(challenge_problems) > 0:
         print(f"\nHi {user}, let's review some challenge problems:")
-        [MathFact.from_problem(problem).quiz(user=user) for problem in history.challenge_problems(user)[:3]]
-    history.load()
+        # Each missed fact is followed by its inverse, e.g. 7 x 8 then 56 / 8
+        [MathFact.from_problem(problem).quiz(user=user) for problem in FactRelations().expand(challenge_problems[:3], limit=1)]
+    history.refresh()
 
     print(f"\nHere's how the next part works. I have baskets of math problems.")
     print("But one problem got dropped in that has a different answer than the others.")
@@ -47,21 +76,13 @@ def main():
     min_operands = {'addition (+)': 1, 'subtraction (-)': 1, 'multiplication (x)': 2, 'division (/)': 2}
     min_operand = min_operands[fact_type]
     points = []
-    fact_library = fact_library_class(min_operand, max_operand)
-    for i in range(10):
-        j = 0
-        while True:
-            j += 1
-            sampled_library = fact_library.sample(2)
-            sampled_library.sort_by_length()
-            if sampled_library.fact_library[-1].len > 1:
-                break
-            elif j > 1000:
-                raise ValueError("Sampled library doesn't contain a fact family with more than one fact. Please increase your max operand.")
-        basket = sampled_library.fact_library[-1].sample(4)
-        bad_egg = sampled_library.fact_library[0].sample_fact(1)
-        basket.append(bad_egg)
-        basket.shuffle()
+    fact_library = fact_library_class(min_operand, max_operand, lazy=True)
+    # Upcoming rounds are built in the background while the student answers
+    rounds = prefetch(iter_rounds(fact_library, max_operand), depth=2)
+    for i in range(ROUNDS):
+        with metrics.timer('egghunt.round_wait'):
+            basket, bad_egg = next(rounds)
+        metrics.count('egghunt.rounds')
 
         print(f"\n({i+1}) +{round(points[-1]) if len(points) > 0 else 0} feathers", end='')
         count_down(delay=3)
@@ -74,6 +95,7 @@ def main():
         feathers = p.correct + p.correct / p.timing * basket.len * max_operand
 
         points.append(feathers)
+        metrics.count('egghunt.correct' if p.correct else 'egghunt.missed')
         if p.correct:
             print(f"\n    Good! {bad_egg.problem} = {int(bad_egg.answer)}")
         else:
@@ -91,8 +113,9 @@ def main():
     print("| ", earnings, " |", sep="")
     print("+-", "-" * len(earnings), "-+", sep="")
     leaderboard.add_entry(user, round(sum(points)), max_operand, fact_type)
+    leaderboard.display_rank(user, round(sum(points)), fact_type)
     leaderboard.user_overview(user, fact_type)
-    history.load()
+    history.refresh()
     history.report_levels(user)
 
 if __name__ == "__main__":
@@ -0,0 +1,106 @@
+import argparse
+import csv
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+from math_tutor import metrics
+from math_tutor.core.mathfacts import MathFact
+from math_tutor.data import Performance
+from math_tutor.logs.shards import open_historian
+
+PROBLEM_PATTERN = re.compile(r'^\s*(\d+)\s*([-+xX*×/÷:])\s*(\d+)\s*(=.*)?$')
+OPERATOR_SPELLINGS = {'X': 'x', '*': 'x', '×': 'x', '÷': '/', ':': '/'}
+
+
+def normalize_problem(problem: str) -> Optional[str]:
+    """Return a typed-in problem such as "7*8" or "56 ÷ 7 =" in the standard "7 x 8" form, or None."""
+    match = PROBLEM_PATTERN.match(problem or '')
+    if match is None:
+        return None
+    a, operator, b, _ = match.groups()
+    return f'{int(a)} {OPERATOR_SPELLINGS.get(operator, operator)} {int(b)}'
+
+
+def parse_number(text: str, kind=int):
+    try:
+        return kind(text.strip())
+    except (AttributeError, ValueError):
+        return None
+
+
+def read_answer_sheet(filename: str) -> List[Dict]:
+    """Read rows of user, problem, answer and (optionally) timing in seconds."""
+    with open(filename, 'r', newline='', encoding='utf-8-sig') as file:
+        return [{key.strip().lower(): value for key, value in row.items() if key} for row in csv.DictReader(file)]
+
+
+def grade_answers(rows: Iterable[Dict]) -> Tuple[List[Performance], List[Tuple[int, str]]]:
+    """
+    Grade answer sheet rows with MathFact.check_input.
+
+    Each distinct problem becomes a MathFact once, and every row is then graded
+    against it, so a batch costs one fact per problem rather than one per answer.
+    A blank or unreadable answer counts as wrong; a row whose problem has no
+    answer (such as 7 / 0) is skipped without stopping the batch.
+
+    Returns:
+        The graded performances and a list of (row number, reason) for rows that were skipped.
+    """
+    facts = {}
+    performances, skipped = [], []
+    for number, row in enumerate(rows, start=2):  # row 1 is the header
+        user = (row.get('user') or '').strip().title()  # same spelling as names typed into the games
+        problem = normalize_problem(row.get('problem'))
+        if not user:
+            skipped.append((number, "no user"))
+            continue
+        if problem is None:
+            skipped.append((number, f"can't read problem {row.get('problem')!r}"))
+            continue
+        fact = facts.get(problem)
+        if fact is None:
+            try:
+                fact = facts[problem] = MathFact.from_problem(problem)
+            except (ValueError, ZeroDivisionError) as error:
+                skipped.append((number, f"can't grade {problem}: {error}"))
+                continue
+        answer = parse_number(row.get('answer'))
+        correct = answer is not None and fact.check_input(answer)
+        performances.append(Performance(correct, parse_number(row.get('timing'), float), answer, problem, user))
+    metrics.count('grade.rows', len(performances))
+    return performances, skipped
+
+
+@metrics.session
+def main():
+    parser = argparse.ArgumentParser(description="Grade typed-in paper answer sheets and record them in the history.")
+    parser.add_argument('sheets', nargs='+', help="CSV files with user, problem, answer and optional timing columns")
+    parser.add_argument('--history', default='history.json', help="History file (default: history.json)")
+    parser.add_argument('--dry-run', action='store_true', help="Grade and report without recording anything")
+    args = parser.parse_args()
+
+    performances = []
+    for filename in args.sheets:
+        graded, skipped = grade_answers(read_answer_sheet(filename))
+        performances.extend(graded)
+        for number, reason in skipped:
+            print(f"{filename} row {number}: skipped, {reason}")
+
+    summary = {}
+    for performance in performances:
+        tally = summary.setdefault(performance.user, [0, 0])
+        tally[0] += performance.correct
+        tally[1] += 1
+    print(f"\n{'User':<20} {'Right':>6} {'Total':>6}")
+    print("-" * 34)
+    for user, (right, total) in sorted(summary.items()):
+        print(f"{user:<20} {right:>6} {total:>6}")
+
+    if args.dry_run:
+        print(f"\nGraded {len(performances)} answers (dry run, nothing recorded).")
+        return
+    with metrics.timer('grade.record'):
+        count = open_historian(args.history, snapshot=True).add_entries(performances)
+    print(f"\nRecorded {count} answers in {args.history}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import argparse
+import json
+from math import log
+from typing import Dict, Iterable, List, Optional, Tuple
+from math_tutor import metrics
+from math_tutor.data import OPERATORS, Problem, structure_record
+from math_tutor.logs.shards import iter_store_records
+
+# How each operator's facts are laid out on the FactLibrary operand grid
+GRID_AXES = {
+    '+': ('a', 'b'),
+    '-': ('subtract', 'difference'),
+    'x': ('a', 'b'),
+    '/': ('divisor', 'quotient'),
+}
+
+
+def grid_cell(problem: Problem) -> Tuple[int, int]:
+    """Return the (row, column) of a fact on its operator's operand grid."""
+    op, a, b = problem
+    if op == '-':
+        return b, a - b
+    if op == '/':
+        return b, a // b if b else 0
+    return a, b
+
+
+class LatencyHistogram:
+    """
+    Log-spaced histogram of answer times.
+
+    Memory is bounded by the number of bins whatever the number of attempts, and
+    percentiles come out within about 5% of the exact value.
+    """
+    __slots__ = ('counts', 'total')
+    base = 0.05  # seconds at the bottom of the first bin
+    ratio = 1.1  # width of each bin relative to the previous one
+    bins = 100
+
+    def __init__(self):
+        self.counts = {}  # bin -> count; only bins in use are stored
+        self.total = 0
+
+    def add(self, seconds: float):
+        if seconds <= self.base:
+            index = 0
+        else:
+            index = min(int(log(seconds / self.base) / log(self.ratio)), self.bins - 1)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Estimate the q-th quantile (0 <= q <= 1), interpolating within the bin."""
+        if not self.total:
+            return None
+        rank = q * self.total
+        seen = 0
+        for index in sorted(self.counts):
+            count = self.counts[index]
+            if seen + count >= rank:
+                low = self.base * self.ratio ** index
+                return low * self.ratio ** ((rank - seen) / count)
+            seen += count
+        return self.base * self.ratio ** self.bins
+
+
+class FactStats:
+    __slots__ = ('attempts', 'wrong', 'latency')
+
+    def __init__(self):
+        self.attempts = 0
+        self.wrong = 0
+        self.latency = LatencyHistogram()
+
+    @property
+    def error_rate(self) -> float:
+        return self.wrong / self.attempts if self.attempts else 0.0
+
+    def to_dict(self) -> Dict:
+        median, p90 = self.latency.percentile(0.5), self.latency.percentile(0.9)
+        return {
+            'attempts': self.attempts,
+            'error_rate': round(self.error_rate, 3),
+            'timed_attempts': self.latency.total,
+            'median_seconds': None if median is None else round(median, 2),
+            'p90_seconds': None if p90 is None else round(p90, 2),
+        }
+
+
+class ItemAnalysis:
+    """
+    Population statistics per fact, folded from the history one record at a time.
+
+    Records written before answer times were logged count towards attempts and
+    error rates but not the latency percentiles.
+    """
+    def __init__(self):
+        self.facts = {}  # problem_id -> FactStats
+
+    def add(self, entry: Dict):
+        entry = structure_record(entry)
+        stats = self.facts.get(entry['problem_id'])
+        if stats is None:
+            stats = self.facts[entry['problem_id']] = FactStats()
+        stats.attempts += 1
+        if not entry['correct']:
+            stats.wrong += 1
+        if entry.get('timing') is not None:
+            stats.latency.add(entry['timing'])
+
+    def extend(self, entries: Iterable[Dict]) -> 'ItemAnalysis':
+        for entry in entries:
+            self.add(entry)
+        return self
+
+    def hardest(self, n: int = 10, min_attempts: int = 1) -> List[Tuple[str, FactStats]]:
+        """The n facts with the highest error rate (ties broken by the slower median)."""
+        candidates = [(Problem.from_id(problem_id).problem, stats) for problem_id, stats in self.facts.items()
+                      if stats.attempts >= min_attempts]
+        candidates.sort(key=lambda item: (item[1].error_rate, item[1].latency.percentile(0.5) or 0), reverse=True)
+        return candidates[:n]
+
+    def grid(self, operator: str) -> Dict[Tuple[int, int], FactStats]:
+        """The operator's facts keyed by their (row, column) on the operand grid."""
+        cells = {}
+        for problem_id, stats in self.facts.items():
+            problem = Problem.from_id(problem_id)
+            if problem.op == operator:
+                cells[grid_cell(problem)] = stats
+        return cells
+
+    def to_dict(self) -> Dict:
+        return {Problem.from_id(problem_id).problem: stats.to_dict() for problem_id, stats in sorted(self.facts.items())}
+
+
+def cell_value(stats: FactStats, metric: str) -> str:
+    if metric == 'attempts':
+        return str(stats.attempts)
+    if metric == 'error':
+        return f'{round(stats.error_rate * 100)}%'
+    seconds = stats.latency.percentile(0.5 if metric == 'median' else 0.9)
+    return '-' if seconds is None else f'{seconds:.1f}'
+
+
+def print_heat_map(analysis: ItemAnalysis, operator: str, metric: str = 'error', min_attempts: int = 1):
+    cells = {cell: stats for cell, stats in analysis.grid(operator).items() if stats.attempts >= min_attempts}
+    if not cells:
+        return
+    rows = sorted({row for row, _ in cells})
+    columns = sorted({column for _, column in cells})
+    row_label, column_label = GRID_AXES[operator]
+    print(f"\n{operator}  ({metric}; rows: {row_label}, columns: {column_label})")
+    print(f"{'':>5}" + ''.join(f'{column:>6}' for column in columns))
+    for row in rows:
+        values = [cell_value(cells[row, column], metric) if (row, column) in cells else '' for column in columns]
+        print(f'{row:>5}' + ''.join(f'{value:>6}' for value in values))
+
+
+@metrics.session
+def main():
+    parser = argparse.ArgumentParser(description="Find the hardest facts across all students in one pass over the history.")
+    parser.add_argument('--history', default='history.json', help="History file (default: history.json)")
+    parser.add_argument('--metric', choices=('error', 'median', 'p90', 'attempts'), default='error',
+                        help="Value shown in the heat maps (default: error rate)")
+    parser.add_argument('--hardest', type=int, default=10, help="How many of the hardest facts to list (default: 10)")
+    parser.add_argument('--min-attempts', type=int, default=1, help="Ignore facts with fewer attempts (default: 1)")
+    parser.add_argument('--json', metavar='FILE', help="Also write the per-fact statistics to a JSON file")
+    args = parser.parse_args()
+
+    with metrics.timer('item_analysis.scan'):
+        analysis = ItemAnalysis().extend(iter_store_records(args.history))
+    if not analysis.facts:
+        print(f"No history found in {args.history}.")
+        return
+
+    print(f"Hardest facts:")
+    for problem, stats in analysis.hardest(args.hardest, args.min_attempts):
+        median = stats.latency.percentile(0.5)
+        timing = f", median {median:.1f}s" if median is not None else ''
+        print(f"  {problem:<10} missed by {round(stats.error_rate * 100)}% of {stats.attempts} attempts{timing}")
+
+    for operator in OPERATORS:
+        print_heat_map(analysis, operator, args.metric, args.min_attempts)
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(analysis.to_dict(), file, indent=4)
+        print(f"\nWrote {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import tracemalloc
+from typing import Callable, Tuple
+from math_tutor.data import Performance
+from math_tutor.logs.shards import open_historian
+
+OPERATORS = ('+', '-', 'x', '/')
+
+
+def measure(build: Callable) -> Tuple[object, int, int]:
+    """Run build() under tracemalloc and return (result, current bytes, peak bytes) it allocated."""
+    tracemalloc.start()
+    try:
+        result = build()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current, peak
+
+
+def random_performance(user: str) -> Performance:
+    operator = random.choice(OPERATORS)
+    a, b = random.randint(1, 12), random.randint(1, 12)
+    return Performance(random.random() < 0.8, random.uniform(0.5, 8.0), a, f'{a} {operator} {b}', user)
+
+
+def simulate(filename: str, max_history: int, entries: int, steps: int = 5):
+    """
+    Add synthetic entries to a copy of the history through a bounded Historian and
+    print the traced memory as it grows; the figures should level off once the ring
+    buffer is full.
+    """
+    directory = tempfile.mkdtemp()
+    try:
+        copy = os.path.join(directory, 'history.json')
+        if os.path.exists(filename):
+            shutil.copyfile(filename, copy)
+        tracemalloc.start()
+        historian = open_historian(copy, shared=False, max_history=max_history)
+        print(f"\n{'Added':>10} {'In memory':>10} {'Current KiB':>12} {'Peak KiB':>10}")
+        step = max(1, entries // steps)
+        for added in range(1, entries + 1):
+            historian.add_entry(random_performance(f'kiosk{added % 7}'))
+            if added % step == 0 or added == entries:
+                current, peak = tracemalloc.get_traced_memory()
+                print(f"{added:>10} {len(historian.history):>10} {current / 1024:>12.1f} {peak / 1024:>10.1f}")
+        tracemalloc.stop()
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report how much memory the history takes, in full and bounded modes.")
+    parser.add_argument('--history', default='history.json', help="History file (default: history.json)")
+    parser.add_argument('--max-history', type=int, default=1000, help="Ring buffer size for the bounded mode (default: 1000)")
+    parser.add_argument('--simulate', type=int, default=0, metavar='N',
+                        help="Also add N synthetic entries to a temporary copy of the history in bounded mode")
+    parser.add_argument('--top', type=int, default=0, help="Show the top allocation sites of the full load")
+    args = parser.parse_args()
+
+    print(f"{'Mode':<22} {'Records held':>12} {'Current KiB':>12} {'Peak KiB':>10}")
+    print("-" * 59)
+    modes = [
+        ('full', {}),
+        (f'bounded ({args.max_history})', {'max_history': args.max_history}),
+        ('snapshot', {'snapshot': True}),
+    ]
+    for label, kwargs in modes:
+        historian, current, peak = measure(lambda: open_historian(args.history, shared=False, **kwargs))
+        print(f"{label:<22} {len(historian.history):>12} {current / 1024:>12.1f} {peak / 1024:>10.1f}")
+        del historian
+
+    if args.top:
+        tracemalloc.start()
+        historian = open_historian(args.history, shared=False)
+        stats = tracemalloc.take_snapshot().statistics('lineno')
+        tracemalloc.stop()
+        print(f"\nTop {args.top} allocation sites of the full load:")
+        for stat in stats[:args.top]:
+            print(f"  {stat}")
+        del historian
+
+    if args.simulate:
+        simulate(args.history, args.max_history, args.simulate)
+
+if __name__ == "__main__":
+    main()
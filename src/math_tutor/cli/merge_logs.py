@@ -0,0 +1,74 @@
+import argparse
+import heapq
+import json
+import os
+from typing import Dict, Iterator, List
+from math_tutor import metrics
+from math_tutor.logs.journal import write_json_records
+from math_tutor.logs.shards import ShardDirectory
+from math_tutor.utils import iter_json_records
+
+
+def timestamp(entry: Dict) -> str:
+    return entry.get('timestamp', '')
+
+
+def ordered_records(filename: str, stats: Dict) -> Iterator[Dict]:
+    """Stream one input's records, counting any that are out of timestamp order."""
+    last = ''
+    for entry in iter_json_records(filename):
+        if timestamp(entry) < last:
+            stats['out_of_order'] += 1
+        last = max(last, timestamp(entry))
+        stats['read'] += 1
+        yield entry
+
+
+def merge_records(filenames: List[str], stats: Dict) -> Iterator[Dict]:
+    """
+    k-way merge of the inputs by timestamp, dropping identical records.
+
+    Only the head of each input and the records sharing the current timestamp are
+    held in memory, so memory depends on the number of inputs, not their length.
+    """
+    streams = [ordered_records(filename, stats) for filename in filenames if os.path.exists(filename)]
+    current, seen = None, set()
+    for entry in heapq.merge(*streams, key=timestamp):
+        if timestamp(entry) != current:
+            current, seen = timestamp(entry), set()
+        key = json.dumps(entry, sort_keys=True)
+        if key in seen:
+            stats['duplicates'] += 1
+            continue
+        seen.add(key)
+        yield entry
+
+
+@metrics.session
+def main():
+    parser = argparse.ArgumentParser(description="Merge history or leaderboard files from several machines into one.")
+    parser.add_argument('inputs', nargs='+', help="Files to merge, e.g. laptop1/history.json laptop2/history.json")
+    parser.add_argument('-o', '--output', required=True,
+                        help="Merged file to write, e.g. history.json; its existing records are merged in too")
+    args = parser.parse_args()
+    if ShardDirectory.exists_for(args.output):
+        parser.error(f"{args.output} has been split into per-user shards; merge into it before running shard_logs")
+
+    # The output is written to a temporary file and swapped in at the end, so it can be read as an input
+    inputs = []
+    for filename in [args.output] + args.inputs:
+        if not os.path.exists(filename):
+            if filename is not args.output:
+                print(f"{filename} not found, skipped.")
+        elif os.path.abspath(filename) not in map(os.path.abspath, inputs):
+            inputs.append(filename)
+    stats = {'read': 0, 'duplicates': 0, 'out_of_order': 0}
+    written = write_json_records(args.output, merge_records(inputs, stats))
+    print(f"Merged {stats['read']} records from {len(inputs)} files into {args.output}: "
+          f"{written} written, {stats['duplicates']} duplicates dropped.")
+    if stats['out_of_order']:
+        print(f"Warning: {stats['out_of_order']} records were out of timestamp order in their input file, "
+              "so the merged file is not fully sorted.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import argparse
+from math_tutor import metrics
+from math_tutor.core.mathfacts import history
+from math_tutor.core.practice import MixedPractice
+from math_tutor.cli.utils import UserChoiceList
+
+
+@metrics.session
+def main():
+    parser = argparse.ArgumentParser(description="Mixed +, -, x and / practice that favors the facts you miss most.")
+    parser.add_argument('--questions', type=int, default=20, help="Number of questions (default: 20)")
+    parser.add_argument('--operators', default='+-x/', help="Operators to mix (default: +-x/)")
+    args = parser.parse_args()
+
+    print("\nWhat's your name?")
+    user = UserChoiceList(history.users + ['New User!']).get_choice()
+    if user == 'New User!':
+        user = input("\nWhat's your name? ").title()
+
+    with metrics.timer('practice.build'):
+        practice = MixedPractice(user, history, operators=[operator for operator in args.operators if operator in '+-x/'])
+    levels = ', '.join(f'{operator} up to {level}' for operator, level in practice.levels.items())
+    print(f"\nHi {user}! {args.questions} questions from {len(practice)} facts ({levels}).\n")
+
+    right = 0
+    for _ in range(args.questions):
+        fact = practice.draw()
+        fact.quiz(user=user)
+        correct = fact.session_history[-1].correct
+        practice.record(fact, correct)
+        right += correct
+        if not correct:
+            print(f"    No: {fact.problem} = {int(fact.answer)}")
+
+    print(f"\nYou got {right} of {args.questions} right!")
+    print("Keep practicing: " + ', '.join(fact.problem for fact in practice.weakest(3)))
+
+if __name__ == "__main__":
+    main()
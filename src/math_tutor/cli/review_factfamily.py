@@ -1,5 +1,9 @@
 import sys
 from math_tutor.core.factfamily import MultiplicationFactFamily
+from math_tutor.core.factlibrary import MultiplicationFactLibrary, AdditionFactLibrary, SubtractionFactLibrary, DivisionFactLibrary
+from math_tutor.core.mathfacts import MathFact, history
+from math_tutor.core.relations import FactRelations
+from math_tutor.cli.utils import UserChoiceDict
 
 def get_valid_integer(prompt: str, max_attempts: int = 3) -> int:
     """
@@ -41,6 +45,60 @@ def review_fact_family():
     print(f"Those are the factors of {product} for factors of {max_operand} or less.")
     print("Review complete. Goodbye!")
 
+def review_listed_facts(facts, description: str):
+    """Walk the student through a list of facts, revealing each answer on ENTER."""
+    if not facts:
+        print(f"There are no facts {description}.")
+        return
+    print(f"Press ENTER to see the answer to each fact\n")
+    for fact in facts:
+        input(f"{fact.problem} = ")
+        print(f"{fact.problem} = {int(fact.answer)}\n")
+    print(f"Those are the {len(facts)} facts {description}.")
+
+def review_facts():
+    """
+    Review facts by product family, by operand (e.g. the 7s) or by a range of answers.
+    """
+    print("Hi, how would you like to review?")
+    review_choices = {
+            'a multiplication fact family (e.g. the factors of 12)': 'family',
+            'all facts with an operand (e.g. the 7s)': 'operand',
+            'facts with answers between two numbers (e.g. sums between 10 and 15)': 'answer',
+            'my challenge problems with their related facts (e.g. 7 x 8, 8 x 7, 56 / 8, 56 / 7)': 'challenge',
+        }
+    _, mode = UserChoiceDict(review_choices).get_choice()
+    if mode == 'family':
+        review_fact_family()
+        return
+    if mode == 'challenge':
+        user = input("What's your name? ").title()
+        problems = FactRelations().expand(history.challenge_problems(user)[:5])
+        review_listed_facts([MathFact.from_problem(problem) for problem in problems], "related to your challenge problems")
+        print("Review complete. Goodbye!")
+        return
+
+    print("\nWhat kind of math facts?")
+    fact_library_choices = {
+            'addition (+)': (AdditionFactLibrary, 1),
+            'subtraction (-)': (SubtractionFactLibrary, 1),
+            'multiplication (x)': (MultiplicationFactLibrary, 2),
+            'division (/)': (DivisionFactLibrary, 2)
+        }
+    fact_type, (fact_library_class, min_operand) = UserChoiceDict(fact_library_choices).get_choice()
+    max_operand = get_valid_integer("Max operand value: ")
+    # Eager, so the queries below are answered from the operand and answer indexes
+    fact_library = fact_library_class(min_operand, max_operand)
+
+    if mode == 'operand':
+        operand = get_valid_integer("Which number would you like to review? ")
+        review_listed_facts(fact_library.facts_with_operand(operand), f"with a {operand}")
+    else:
+        low = get_valid_integer("Lowest answer: ")
+        high = get_valid_integer("Highest answer: ")
+        review_listed_facts(fact_library.facts_with_answer_between(low, high), f"with answers from {low} to {high}")
+    print("Review complete. Goodbye!")
+
 if __name__ == "__main__":
-    review_fact_family()
+    review_facts()
 
@@ -0,0 +1,140 @@
+import argparse
+import csv
+import hashlib
+import os
+import random
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Sequence, Tuple
+from math_tutor import metrics
+from math_tutor.core.factlibrary import AdditionFactLibrary, SubtractionFactLibrary, MultiplicationFactLibrary, DivisionFactLibrary
+
+FACT_LIBRARIES = {
+    '+': (AdditionFactLibrary, 1),
+    '-': (SubtractionFactLibrary, 1),
+    'x': (MultiplicationFactLibrary, 2),
+    '/': (DivisionFactLibrary, 2),
+}
+COLUMNS = 3
+
+_pools = {}  # (operators, max_operand) -> [(problem, answer)], built once per worker process
+
+
+def fact_pool(operators: str, max_operand: int) -> List[Tuple[str, int]]:
+    """Every (problem, answer) the chosen fact libraries hold, cached per process."""
+    key = (operators, max_operand)
+    if key not in _pools:
+        pool = []
+        for operator in operators:
+            library_class, min_operand = FACT_LIBRARIES[operator]
+            for family in library_class(min_operand, max_operand).fact_library.values():
+                pool.extend((fact.problem, int(fact.answer)) for fact in family.facts)
+        _pools[key] = pool
+    return _pools[key]
+
+
+def sheet_seed(seed: int, student: str) -> int:
+    """A stable seed per student, so rerunning with the same seed reproduces every sheet."""
+    return int.from_bytes(hashlib.sha1(f'{seed}:{student}'.encode('utf-8')).digest()[:8], 'big')
+
+
+def sheet_problems(student: str, options: Dict) -> List[Tuple[str, int]]:
+    pool = fact_pool(options['operators'], options['max_operand'])
+    rng = random.Random(sheet_seed(options['seed'], student))
+    if options['problems'] <= len(pool):
+        return rng.sample(pool, options['problems'])
+    return rng.choices(pool, k=options['problems'])
+
+
+def sheet_filename(index: int, student: str) -> str:
+    return f"{index:04d}-{re.sub(r'[^A-Za-z0-9_-]+', '_', student)[:40]}"
+
+
+def write_text(path: str, student: str, title: str, problems: List[Tuple[str, int]], answers: bool):
+    width = max(len(problem) for problem, _ in problems) + 16
+    with open(path, 'w') as file:
+        file.write(f"Name: {student:<30} {title}\n")
+        file.write("Answer key\n\n" if answers else "\n")
+        for start in range(0, len(problems), COLUMNS):
+            cells = []
+            for number, (problem, answer) in enumerate(problems[start:start + COLUMNS], start=start + 1):
+                cells.append(f"{number:>3}) {problem} = {answer if answers else '____'}".ljust(width))
+            file.write(''.join(cells).rstrip() + '\n')
+
+
+def write_csv(path: str, problems: List[Tuple[str, int]], answers: bool):
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['number', 'problem', 'answer'] if answers else ['number', 'problem'])
+        for number, (problem, answer) in enumerate(problems, start=1):
+            writer.writerow([number, problem, answer] if answers else [number, problem])
+
+
+def write_sheets(job: Tuple[List[Tuple[int, str]], Dict]) -> int:
+    """Generate and write the worksheets and answer keys for a batch of students."""
+    students, options = job
+    for index, student in students:
+        problems = sheet_problems(student, options)
+        base = os.path.join(options['output'], sheet_filename(index, student))
+        if options['format'] == 'csv':
+            write_csv(base + '.csv', problems, answers=False)
+            write_csv(base + '_key.csv', problems, answers=True)
+        else:
+            write_text(base + '.txt', student, options['title'], problems, answers=False)
+            write_text(base + '_key.txt', student, options['title'], problems, answers=True)
+    return len(students)
+
+
+def generate_worksheets(students: Sequence[str], options: Dict, workers: int = None) -> int:
+    """Spread the students across worker processes in batches; each batch streams its sheets to disk."""
+    os.makedirs(options['output'], exist_ok=True)
+    numbered = list(enumerate(students, start=1))
+    if not numbered:
+        return 0
+    batch_size = max(1, len(numbered) // ((workers or os.cpu_count() or 1) * 4))
+    jobs = [(numbered[start:start + batch_size], options) for start in range(0, len(numbered), batch_size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(write_sheets, jobs))
+
+
+def read_roster(filename: str) -> List[str]:
+    with open(filename, 'r') as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+@metrics.session
+def main():
+    parser = argparse.ArgumentParser(description="Write a seeded practice worksheet and answer key for every student.")
+    parser.add_argument('--roster', help="Text file with one student name per line")
+    parser.add_argument('--count', type=int, default=30, help="Number of numbered sheets when there is no roster (default: 30)")
+    parser.add_argument('--operators', default='x', help="Operators to include, e.g. +- or x/ (default: x)")
+    parser.add_argument('--max-operand', type=int, default=12, help="Largest operand (default: 12)")
+    parser.add_argument('--problems', type=int, default=30, help="Problems per sheet (default: 30)")
+    parser.add_argument('--seed', type=int, default=0, help="Change it each week for new sheets (default: 0)")
+    parser.add_argument('--title', default='', help="Heading printed on every sheet, e.g. 'Week 12'")
+    parser.add_argument('--format', choices=('txt', 'csv'), default='txt')
+    parser.add_argument('--output', default='worksheets', help="Output directory (default: worksheets)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    operators = ''.join(operator for operator in FACT_LIBRARIES if operator in args.operators)
+    if not operators:
+        parser.error("--operators must include at least one of + - x /")
+    if args.problems < 1:
+        parser.error("--problems must be at least 1")
+    students = read_roster(args.roster) if args.roster else [f'Student {n}' for n in range(1, args.count + 1)]
+    options = {
+        'operators': operators,
+        'max_operand': args.max_operand,
+        'problems': args.problems,
+        'seed': args.seed,
+        'title': args.title,
+        'format': args.format,
+        'output': args.output,
+    }
+    with metrics.timer('worksheets.generate'):
+        count = generate_worksheets(students, options, args.workers)
+    print(f"Wrote {count} worksheets and answer keys to {args.output}/")
+
+if __name__ == "__main__":
+    main()
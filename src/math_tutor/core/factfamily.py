@@ -1,6 +1,7 @@
 from typing import List
 from random import sample, shuffle
 from copy import deepcopy
+from math_tutor import metrics
 from math_tutor.core.mathfacts import (
         MathFact,
         AdditionFact,
@@ -49,12 +50,14 @@ class FactFamily:
         """Append a single AdditionFact to the facts list."""
         self._facts.append(fact)
 
+    @metrics.timed('factfamily.sample')
     def sample(self, k) -> 'FactFamily':
         k = min(k, self.len)
         new_instance = deepcopy(self)
         new_instance._facts = sample(self._facts, k)
         return new_instance
 
+    @metrics.timed('factfamily.sample')
     def sample_fact(self, k) -> 'MathFact':
         return deepcopy(sample(self._facts, 1)[0])
 
@@ -131,7 +134,13 @@ class MultiplicationFactFamily(FactFamily):
         Generate all multiplication facts that result in the given product.
         """
         facts = []
-        for i in range(1, self.value + 1):
+        # Only factors that can pair within [min_operand, max_operand] need checking
+        lowest = 1 if self.min_operand is None else max(1, self.min_operand)
+        highest = self.value
+        if self.max_operand is not None:
+            lowest = max(lowest, -(-self.value // self.max_operand))
+            highest = min(highest, self.max_operand)
+        for i in range(lowest, highest + 1):
             if self.value % i == 0:
                 a = i
                 b = self.value // i
@@ -1,10 +1,98 @@
-from typing import List
-from random import sample
-from copy import deepcopy
-from math_tutor.core.mathfacts import AdditionFact, SubtractionFact, MultiplicationFact, DivisionFact
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from math import isqrt
+import random
+import threading
+from random import randrange, sample
+from copy import copy
+from math_tutor import metrics
+from math_tutor.core.mathfacts import MathFact, AdditionFact, SubtractionFact, MultiplicationFact, DivisionFact
 from math_tutor.core.factfamily import AdditionFactFamily, SubtractionFactFamily, MultiplicationFactFamily, DivisionFactFamily
 
+class LazyFactFamilies:
+    """
+    Dict-like set of fact families that builds each family only when it is accessed.
+
+    The candidate values are a range, so picking a random family is arithmetic
+    rather than a lookup in a materialized dict. When only some values in the
+    range have facts (products), has_family tells them apart and random picks
+    retry until they land on one. Built families are kept in a small LRU cache,
+    guarded by a lock so a prefetch thread can build families alongside the game.
+    """
+    def __init__(self, family_class: type, values: range, min_operand: int, max_operand: int,
+                 has_family: Callable[[int], bool] = None, cache_size: int = 1024):
+        self.family_class = family_class
+        self.min_operand = min_operand
+        self.max_operand = max_operand
+        self._values = values
+        self._has_family = has_family
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        self._len = None
+
+    def __contains__(self, value) -> bool:
+        return value in self._values and (self._has_family is None or self._has_family(value))
+
+    def __getitem__(self, value):
+        with self._lock:
+            family = self._cache.get(value)
+            if family is not None:
+                self._cache.move_to_end(value)
+                return family
+        if value not in self:
+            raise KeyError(value)
+        family = self.family_class(value, self.min_operand, self.max_operand)
+        with self._lock:
+            self._cache[value] = family
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return family
+
+    def get(self, value, default=None):
+        return self[value] if value in self else default
+
+    def keys(self) -> Iterator[int]:
+        return (value for value in self._values if self._has_family is None or self._has_family(value))
+
+    __iter__ = keys
+
+    def values(self) -> Iterator:
+        return (self[value] for value in self.keys())
+
+    def items(self) -> Iterator:
+        return ((value, self[value]) for value in self.keys())
+
+    def __len__(self) -> int:
+        if self._len is None:
+            self._len = len(self._values) if self._has_family is None else sum(1 for _ in self.keys())
+        return self._len
+
+    def random_key(self) -> int:
+        """Pick a family value uniformly at random without enumerating the library."""
+        if not self._values:
+            raise ValueError("The fact library is empty.")
+        while True:
+            value = self._values[randrange(len(self._values))]
+            if self._has_family is None or self._has_family(value):
+                return value
+
+    def sample_keys(self, k: int) -> List[int]:
+        """Pick k distinct family values at random."""
+        if len(self._values) <= 4 * k:
+            return sample(list(self.keys()), min(k, len(self)))
+        keys = []
+        while len(keys) < k:
+            value = self.random_key()
+            if value not in keys:
+                keys.append(value)
+        return keys
+
+
 class FactLibrary:
+    family_class = None
+
     def __init__(self, min_operand: int = 2, max_operand: int = 12):
         self.max_operand = max_operand
         self.min_operand = min_operand
@@ -16,6 +104,118 @@ class FactLibrary:
         """
         raise NotImplementedError("Subclasses must implement this method.")
 
+    def family_values(self) -> range:
+        """
+        Return the range of values that can have a fact family. This method should be overridden by subclasses.
+        """
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    def has_family(self, value: int) -> bool:
+        """Whether value has a non-empty family; only needed when family_values() has gaps."""
+        return True
+
+    def lazy_library(self) -> LazyFactFamilies:
+        """
+        Return a library whose families are built on demand, for very large operand ranges.
+        """
+        has_family = None if type(self).has_family is FactLibrary.has_family else self.has_family
+        return LazyFactFamilies(self.family_class, self.family_values(), self.min_operand, self.max_operand, has_family)
+
+    @property
+    def lazy(self) -> bool:
+        return isinstance(self.fact_library, LazyFactFamilies)
+
+    def operand_candidates(self, operand: int) -> Iterable[int]:
+        """
+        Return family values that may contain a fact with the given operand (a superset is fine).
+        Subclasses narrow this down; the default is every possible family.
+        """
+        return self.family_values()
+
+    @property
+    def operand_index(self) -> Dict[int, List[MathFact]]:
+        """Inverted index of operand -> facts that use it, built on first use."""
+        if getattr(self, '_operand_index', None) is None:
+            index = {}
+            for family in self.fact_library.values():
+                for fact in family.facts:
+                    index.setdefault(fact.a, []).append(fact)
+                    if fact.b != fact.a:
+                        index.setdefault(fact.b, []).append(fact)
+            self._operand_index = index
+        return self._operand_index
+
+    @property
+    def answer_index(self) -> List[int]:
+        """Sorted answers (family values) of the library, for range lookups by bisect."""
+        if getattr(self, '_answer_index', None) is None:
+            self._answer_index = sorted(self.fact_library.keys())
+        return self._answer_index
+
+    def facts_with_operand(self, operand: int) -> List[MathFact]:
+        """Return every fact that uses operand, e.g. all the 7s."""
+        if self.lazy:
+            # Building a full index would defeat the lazy library, so only visit candidate families
+            families = (self.fact_library.get(value) for value in self.operand_candidates(operand))
+            return [fact for family in families if family for fact in family.facts if operand in (fact.a, fact.b)]
+        return list(self.operand_index.get(operand, ()))
+
+    def facts_with_answer(self, answer: int) -> List[MathFact]:
+        """Return every fact whose answer is answer (a family is keyed by its answer)."""
+        family = self.fact_family(answer)
+        return list(family.facts) if family is not None else []
+
+    def facts_with_answer_between(self, low: int, high: int) -> List[MathFact]:
+        """Return every fact whose answer lies in [low, high]."""
+        if self.lazy:
+            values = (value for value in range(low, high + 1) if value in self.fact_library)
+        else:
+            answers = self.answer_index
+            values = answers[bisect_left(answers, low):bisect_right(answers, high)]
+        return [fact for value in values for fact in self.fact_library[value].facts]
+
+    def families_near(self, answer: int, max_distance: int, min_distance: int = 1) -> List[int]:
+        """
+        Return the family answers within [min_distance, max_distance] of answer, nearest first.
+
+        Eager libraries slice the sorted answer index with two bisects; lazy ones
+        only probe the values in range, so neither scans the whole library.
+        """
+        if self.lazy:
+            values = [value for value in range(answer - max_distance, answer + max_distance + 1) if value in self.fact_library]
+        else:
+            answers = self.answer_index
+            values = answers[bisect_left(answers, answer - max_distance):bisect_right(answers, answer + max_distance)]
+        return sorted((value for value in values if abs(value - answer) >= min_distance), key=lambda value: abs(value - answer))
+
+    def nearest_family(self, answer: int) -> Optional[int]:
+        """Return the family answer closest to answer other than answer itself (the lower one on ties)."""
+        if self.lazy:
+            values = self.family_values()
+            for distance in range(1, max(answer - values.start, values.stop - answer) + 1):
+                for value in (answer - distance, answer + distance):
+                    if value in self.fact_library:
+                        return value
+            return None
+        answers = self.answer_index
+        position = bisect_left(answers, answer)
+        below = answers[position - 1] if position > 0 else None
+        if position < len(answers) and answers[position] == answer:
+            position += 1
+        above = answers[position] if position < len(answers) else None
+        if below is None or (above is not None and above - answer < answer - below):
+            return above
+        return below
+
+    def distractor_family(self, answer: int, max_distance: int, rng=random) -> Optional[int]:
+        """
+        Pick a family whose answer is close to, but not, answer: a random one within
+        max_distance, or the nearest one if none is that close. Smaller distances make
+        the odd one out harder to spot.
+        """
+        near = self.families_near(answer, max_distance)
+        return rng.choice(near) if near else self.nearest_family(answer)
+
     def fact_family(self, family):
         return self.fact_library[family] if family in self.fact_library else None
 
@@ -23,6 +223,7 @@ class FactLibrary:
     def len(self):
         return len(self.fact_library)
 
+    @metrics.timed('factlibrary.sample')
     def sample(self, k: int) -> 'FactLibrary':
         """
         Sample k fact families from the fact library to form a new library.
@@ -30,9 +231,13 @@ class FactLibrary:
         Returns:
             A fact library sampled from the original instance.
         """
-        k = min(k, self.len)
-        new_instance = deepcopy(self)
-        new_instance.fact_library = [self.fact_family(family) for family in sample(list(self.fact_library.keys()), k)]
+        if self.lazy:
+            families = self.fact_library.sample_keys(k)
+        else:
+            families = sample(list(self.fact_library.keys()), min(k, self.len))
+        # The sampled families replace the library, so a shallow copy is enough
+        new_instance = copy(self)
+        new_instance.fact_library = [self.fact_family(family) for family in families]
         return new_instance
 
     def sort_by_length(self):
@@ -48,22 +253,33 @@ class FactLibrary:
         return {k: v.problems for k, v in self.fact_library.items()}
 
     def problem(self, family=None):
-        problem_dict = {k: v.problems for k, v in self.fact_library.items()}
         if family is None:
-            return problem_dict
-        else:
-            return problem_dict[family] if family in problem_dict else None
+            return self.problems
+        fact_family = self.fact_family(family)
+        return fact_family.problems if fact_family is not None else None
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}(max_value={self.max_value}, max_operand={self.max_operand}, fact_family={self.fact_library})"
 
 
 class AdditionFactLibrary(FactLibrary):
-    def __init__(self, min_operand: int = 1, max_operand: int = 12, fact_library: List[AdditionFactFamily] = None):
+    family_class = AdditionFactFamily
+
+    def __init__(self, min_operand: int = 1, max_operand: int = 12, fact_library: List[AdditionFactFamily] = None, lazy: bool = False):
         super().__init__(min_operand, max_operand)  # Initialize the base class
         self.max_value = None
-        self.fact_library = fact_library if fact_library is not None else self.generate_library()
+        if fact_library is None:
+            fact_library = self.lazy_library() if lazy else self.generate_library()
+        self.fact_library = fact_library
+
+    def family_values(self) -> range:
+        lowest = max(self.min_operand, 1)
+        return range(2 * lowest, 2 * self.max_operand + 1)
 
+    def operand_candidates(self, operand: int) -> Iterable[int]:
+        return range(operand + max(self.min_operand, 1), operand + self.max_operand + 1)
+
+    @metrics.timed('factlibrary.generate')
     def generate_library(self) -> dict[AdditionFactFamily]:
         """
         Generate all addition facts that result in the given sum.
@@ -80,11 +296,23 @@ class AdditionFactLibrary(FactLibrary):
 
 
 class SubtractionFactLibrary(AdditionFactLibrary):
-    def __init__(self, min_operand: int = 1, max_operand: int = 12, fact_library: List[SubtractionFactFamily] = None):
-        super().__init__(min_operand, max_operand)  # Initialize the base class
+    family_class = SubtractionFactFamily
+
+    def __init__(self, min_operand: int = 1, max_operand: int = 12, fact_library: List[SubtractionFactFamily] = None, lazy: bool = False):
+        super().__init__(min_operand, max_operand, fact_library={})  # Initialize the base class without building an addition library
         self.max_value = None
-        self.fact_library = fact_library if fact_library is not None else self.generate_library()
+        if fact_library is None:
+            fact_library = self.lazy_library() if lazy else self.generate_library()
+        self.fact_library = fact_library
+
+    def family_values(self) -> range:
+        lowest = max(self.min_operand, 1)
+        return range(lowest, self.max_operand - lowest + 1)
 
+    def operand_candidates(self, operand: int) -> Iterable[int]:
+        return self.family_values()
+
+    @metrics.timed('factlibrary.generate')
     def generate_library(self) -> dict[SubtractionFactFamily]:
         """
         Generate all addition facts that result in the given sum.
@@ -101,11 +329,28 @@ class SubtractionFactLibrary(AdditionFactLibrary):
 
 
 class MultiplicationFactLibrary(FactLibrary):
-    def __init__(self, min_operand: int = 2, max_operand: int = 12, fact_library: List[MultiplicationFactFamily] = None):
+    family_class = MultiplicationFactFamily
+
+    def __init__(self, min_operand: int = 2, max_operand: int = 12, fact_library: List[MultiplicationFactFamily] = None, lazy: bool = False):
         super().__init__(min_operand, max_operand)  # Initialize the base class
         self.max_value = None
-        self.fact_library = fact_library if fact_library is not None else self.generate_library()
+        if fact_library is None:
+            fact_library = self.lazy_library() if lazy else self.generate_library()
+        self.fact_library = fact_library
+
+    def family_values(self) -> range:
+        lowest = max(self.min_operand, 1)
+        return range(lowest * lowest, self.max_operand * self.max_operand + 1)
+
+    def operand_candidates(self, operand: int) -> Iterable[int]:
+        return (operand * other for other in range(max(self.min_operand, 1), self.max_operand + 1))
 
+    def has_family(self, value: int) -> bool:
+        """Whether value factors into two operands within [min_operand, max_operand]."""
+        lowest = max(self.min_operand, 1, -(-value // self.max_operand))
+        return any(value % a == 0 for a in range(lowest, min(self.max_operand, isqrt(value)) + 1))
+
+    @metrics.timed('factlibrary.generate')
     def generate_library(self) -> dict[MultiplicationFactFamily]:
         """
         Generate all multiplication facts that result in the given product.
@@ -122,11 +367,19 @@ class MultiplicationFactLibrary(FactLibrary):
 
 
 class DivisionFactLibrary(FactLibrary):
-    def __init__(self, min_operand: int = 2, max_operand: int = 12, fact_library: List[DivisionFactFamily] = None):
+    family_class = DivisionFactFamily
+
+    def __init__(self, min_operand: int = 2, max_operand: int = 12, fact_library: List[DivisionFactFamily] = None, lazy: bool = False):
         super().__init__(min_operand, max_operand)  # Initialize the base class
         self.max_value = None
-        self.fact_library = fact_library if fact_library is not None else self.generate_library()
+        if fact_library is None:
+            fact_library = self.lazy_library() if lazy else self.generate_library()
+        self.fact_library = fact_library
+
+    def family_values(self) -> range:
+        return range(self.min_operand, self.max_operand + 1)
 
+    @metrics.timed('factlibrary.generate')
     def generate_library(self) -> dict[MultiplicationFactFamily]:
         """
         Generate all division facts that result in the given quotient.
@@ -1,27 +1,34 @@
 from typing import Tuple, Union, Optional
 import random
+from collections import deque
 from math_tutor.utils import timeit_decorator
 from typing import NamedTuple
-from statistics import mean
-from math_tutor.logs.historian import Historian
-from math_tutor.data import Performance
+from math_tutor.logs.shards import open_historian
+from math_tutor.data import Performance, Problem
 
 
-history = Historian('history.json')
+history = open_historian('history.json', snapshot=True)
 
 class MathFact:
+    session_history_limit = 100  # attempts kept per fact; older ones survive only in the running totals
+
     def __init__(self, a: int, b: int):
         self.a = a
         self.b = b
         self.symbol = None
         self.ans_name = None
         self.answer = None
-        self.session_history = []
+        self.session_history = deque(maxlen=self.session_history_limit)
+        self.attempts = 0
+        self._total_timing = 0
+        self._total_correct = 0
         self.quiz_logging = True
 
     @classmethod
-    def from_problem(cls, problem):
-        a, symbol, b = problem.split()
+    def from_problem(cls, problem: Union[str, Problem]):
+        if isinstance(problem, str):
+            problem = Problem.parse(problem)
+        symbol, a, b = problem
         fact_class_options = {
             '+': AdditionFact,
             '-': SubtractionFact,
@@ -29,7 +36,7 @@ class MathFact:
             '/': DivisionFact
         }
         fact_class = fact_class_options.get(symbol, MathFact)
-        return fact_class(int(a), int(b))
+        return fact_class(a, b)
 
     def generate(self) -> Tuple[int, int, int]:
         """
@@ -71,17 +78,21 @@ class MathFact:
         if self.quiz_logging:
             history.add_entry(perf)
         self.session_history.append(perf)
+        self.attempts += 1
+        self._total_timing += perf.timing
+        self._total_correct += int(perf.correct)
 
     @property
     def performance(self) -> Performance[NamedTuple]:
-        if len(self.session_history) > 1:
-            mean_timing = mean(result.timing for result in self.session_history)
-            mean_correctness = mean(map(int, (result.correct for result in self.session_history)))
+        if self.attempts > 1:
+            # Means cover every attempt; answers are the most recent session_history_limit
+            mean_timing = self._total_timing / self.attempts
+            mean_correctness = self._total_correct / self.attempts
             answers = [result.answer for result in self.session_history]
-            problem = [result.problem for result in self.session_history][0]
-            user = [result.user for result in self.session_history][0]
+            problem = self.session_history[0].problem
+            user = self.session_history[0].user
             return Performance(mean_correctness, mean_timing, answers, problem, user)
-        elif len(self.session_history) == 0:
+        elif self.attempts == 0:
             return None
         else:
             return self.session_history[-1]
@@ -0,0 +1,154 @@
+import random
+from typing import Dict, Iterable, List, Sequence
+from math_tutor.core.factlibrary import AdditionFactLibrary, SubtractionFactLibrary, MultiplicationFactLibrary, DivisionFactLibrary
+from math_tutor.core.mathfacts import MathFact
+from math_tutor.data import OPERATORS, Problem
+
+
+class AliasTable:
+    """
+    Vose's alias method over a fixed list of weights: O(n) to build, O(1) per draw.
+    """
+    __slots__ = ('probability', 'alias', 'total')
+
+    def __init__(self, weights: Sequence[float]):
+        n = len(weights)
+        self.total = sum(weights)
+        self.probability = [1.0] * n
+        self.alias = list(range(n))
+        if n == 0 or self.total <= 0:
+            return  # Nothing to weight; draws fall back to uniform
+
+        scaled = [weight * n / self.total for weight in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] += scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Whatever is left is 1 up to rounding error
+
+    def draw(self, rng=random) -> int:
+        index = int(rng.random() * len(self.alias))
+        return index if rng.random() < self.probability[index] else self.alias[index]
+
+    def __len__(self) -> int:
+        return len(self.alias)
+
+
+class WeightedSampler:
+    """
+    Weighted random draws in O(1) over weights that keep changing.
+
+    Items are split into blocks, each with its own alias table, under a small alias
+    table over the block totals. Changing a weight only marks its block; before
+    the next draw the marked blocks and the top table are rebuilt, which costs
+    O(block_size + blocks) rather than O(n).
+    """
+    def __init__(self, weights: Iterable[float], block_size: int = 256):
+        self.weights = list(weights)
+        self.block_size = block_size
+        self._blocks = [AliasTable(self.weights[start:start + block_size])
+                        for start in range(0, len(self.weights), block_size)]
+        self._top = AliasTable([block.total for block in self._blocks])
+        self._dirty = set()
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def update(self, index: int, weight: float):
+        """Change the weight of one item; the tables are rebuilt lazily before the next draw."""
+        if self.weights[index] != weight:
+            self.weights[index] = weight
+            self._dirty.add(index // self.block_size)
+
+    def _rebuild(self):
+        for block in self._dirty:
+            start = block * self.block_size
+            self._blocks[block] = AliasTable(self.weights[start:start + self.block_size])
+        self._top = AliasTable([block.total for block in self._blocks])
+        self._dirty.clear()
+
+    def draw(self, rng=random) -> int:
+        if not self.weights:
+            raise IndexError("Cannot draw from an empty sampler")
+        if self._dirty:
+            self._rebuild()
+        block = self._top.draw(rng)
+        return block * self.block_size + self._blocks[block].draw(rng)
+
+
+def weakness(right: int, wrong: int) -> float:
+    """Smoothed miss rate: facts never tried count as 50% and each answer moves it towards the observed rate."""
+    return (wrong + 1) / (right + wrong + 2)
+
+
+class MixedPractice:
+    """
+    Mixed practice across +, -, x and / for one student, drawing more often the
+    facts the student misses most.
+
+    Example:
+        practice = MixedPractice('Ada', history)
+        fact = practice.draw()
+        fact.quiz(user='Ada')
+        practice.record(fact, fact.session_history[-1].correct)
+    """
+    library_classes = {
+        '+': AdditionFactLibrary,
+        '-': SubtractionFactLibrary,
+        'x': MultiplicationFactLibrary,
+        '/': DivisionFactLibrary,
+    }
+    min_operands = {'+': 1, '-': 1, 'x': 2, '/': 2}
+
+    def __init__(self, user: str, history, levels: Dict[str, int] = None, operators: Sequence[str] = OPERATORS,
+                 seed: int = None):
+        """
+        Args:
+            user (str): The student practicing.
+            history (Historian): Supplies the student's right/wrong counts per fact.
+            levels (dict): Max operand per operator; defaults to the suggested level.
+            operators (sequence): Which operators to mix.
+            seed (int): Seed for a reproducible sequence of draws.
+        """
+        self.user = user
+        self.history = history
+        self.levels = levels or {operator: history.suggest_level(user, operator) for operator in operators}
+        self.facts: List[MathFact] = []
+        for operator in operators:
+            library = self.library_classes[operator](self.min_operands[operator], self.levels[operator])
+            for family in library.fact_library.values():
+                self.facts.extend(family.facts)
+
+        outcomes = history.problem_outcomes(user)
+        self._positions = {}
+        self._tallies = []
+        for position, fact in enumerate(self.facts):
+            problem_id = Problem(fact.symbol, fact.a, fact.b).id
+            self._positions[problem_id] = position
+            self._tallies.append(list(outcomes.get(problem_id, (0, 0))))
+        self.sampler = WeightedSampler(weakness(right, wrong) for right, wrong in self._tallies)
+        self.rng = random.Random(seed)
+
+    def __len__(self) -> int:
+        return len(self.facts)
+
+    def draw(self) -> MathFact:
+        return self.facts[self.sampler.draw(self.rng)]
+
+    def record(self, fact: MathFact, correct: bool):
+        """Fold one answer into the fact's weight."""
+        position = self._positions.get(Problem(fact.symbol, fact.a, fact.b).id)
+        if position is None:
+            return
+        tally = self._tallies[position]
+        tally[0 if correct else 1] += 1
+        self.sampler.update(position, weakness(*tally))
+
+    def weakest(self, n: int = 5) -> List[MathFact]:
+        """The n facts currently weighted highest."""
+        order = sorted(range(len(self.facts)), key=self.sampler.weights.__getitem__, reverse=True)
+        return [self.facts[position] for position in order[:n]]
@@ -0,0 +1,99 @@
+from typing import Dict, Iterable, List, Tuple, Union
+from math_tutor.core.factlibrary import AdditionFactLibrary, SubtractionFactLibrary, MultiplicationFactLibrary, DivisionFactLibrary
+from math_tutor.data import Problem
+
+
+def relatives(problem: Problem) -> Tuple[Problem, ...]:
+    """
+    Return the facts tied to a problem by commutativity or by the inverse operation,
+    inverse facts before the turnaround: 7 x 8 -> 56 / 7, 56 / 8, 8 x 7 and 15 - 8 -> 8 + 7, 7 + 8, 15 - 7.
+    """
+    op, a, b = problem
+    if op == '+':
+        related = [Problem('-', a + b, a), Problem('-', a + b, b), Problem('+', b, a)]
+    elif op == 'x':
+        related = []
+        if a:
+            related.append(Problem('/', a * b, a))
+        if b:
+            related.append(Problem('/', a * b, b))
+        related.append(Problem('x', b, a))
+    elif op == '-':
+        difference = a - b
+        if difference < 0:
+            return ()
+        related = [Problem('+', b, difference), Problem('+', difference, b), Problem('-', a, difference)]
+    elif op == '/':
+        if not b or a % b:
+            return ()
+        quotient = a // b
+        related = [Problem('x', quotient, b), Problem('x', b, quotient), Problem('/', a, quotient)]
+    else:
+        return ()
+    unique = []
+    for relative in related:
+        if relative != problem and relative not in unique:
+            unique.append(relative)
+    return tuple(unique)
+
+
+class FactRelations:
+    """
+    Precomputed links from every fact in the addition, subtraction, multiplication
+    and division libraries to its turnaround and inverse facts (which may lie
+    outside the libraries, e.g. 7 + 8 -> 15 - 8).
+
+    Looking up a fact's relatives is a single dict lookup by problem id, so a
+    missed fact expands to its whole family in O(1) per related fact.
+    """
+    library_classes = (
+        (AdditionFactLibrary, 1),
+        (SubtractionFactLibrary, 1),
+        (MultiplicationFactLibrary, 2),
+        (DivisionFactLibrary, 2),
+    )
+
+    def __init__(self, max_operand: int = 12):
+        self.max_operand = max_operand
+        self._relatives: Dict[int, Tuple[Problem, ...]] = {}
+        for library_class, min_operand in self.library_classes:
+            for family in library_class(min_operand, max_operand).fact_library.values():
+                for fact in family.facts:
+                    problem = Problem(fact.symbol, fact.a, fact.b)
+                    self._relatives[problem.id] = relatives(problem)
+
+    def __len__(self) -> int:
+        return len(self._relatives)
+
+    def related(self, problem: Union[str, Problem]) -> Tuple[Problem, ...]:
+        """The facts related to problem; facts outside the index are worked out on the spot."""
+        if isinstance(problem, str):
+            problem = Problem.parse(problem)
+        found = self._relatives.get(problem.id)
+        return relatives(problem) if found is None else found
+
+    def family(self, problem: Union[str, Problem]) -> List[str]:
+        """The problem followed by its related facts, as problem strings."""
+        if isinstance(problem, str):
+            problem = Problem.parse(problem)
+        return [problem.problem] + [relative.problem for relative in self.related(problem)]
+
+    def expand(self, problems: Iterable[Union[str, Problem]], limit: int = None) -> List[str]:
+        """
+        Expand each problem to its family, dropping repeats but keeping the order.
+
+        Args:
+            limit (int): At most this many related facts per problem, inverse
+                operations (56 / 7 for 7 x 8) before turnarounds (8 x 7).
+        """
+        seen = set()
+        expanded = []
+        for problem in problems:
+            if isinstance(problem, str):
+                problem = Problem.parse(problem)
+            related = self.related(problem)[:limit]
+            for member in [problem.problem] + [relative.problem for relative in related]:
+                if member not in seen:
+                    seen.add(member)
+                    expanded.append(member)
+        return expanded
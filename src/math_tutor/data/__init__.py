@@ -1,4 +1,8 @@
-from typing import NamedTuple, Union
+import sys
+from datetime import datetime, timedelta
+from functools import lru_cache
+from math import isqrt
+from typing import Any, Dict, NamedTuple, Union
 
 
 class Performance(NamedTuple):
@@ -6,4 +10,167 @@ class Performance(NamedTuple):
     timing: float
     answer: Union[int, list[int]]
     problem: str
-    user: str
\ No newline at end of file
+    user: str
+
+
+OPERATORS = ('+', '-', 'x', '/')
+
+
+class Problem(NamedTuple):
+    """
+    Structured form of a problem such as "7 x 8".
+
+    Every problem maps to a compact integer id: the operand pair is packed with
+    Szudzik's pairing function and the operator takes the two low bits. The
+    mapping is deterministic, so ids agree across processes and machines.
+    """
+    op: str
+    a: int
+    b: int
+
+    @classmethod
+    def parse(cls, problem: str) -> 'Problem':
+        """Parse a display string such as "7 x 8" (cached, so each string is split once)."""
+        return _parse_problem(problem)
+
+    @classmethod
+    def from_id(cls, problem_id: int) -> 'Problem':
+        return _problem_from_id(problem_id)
+
+    @property
+    def id(self) -> int:
+        a, b = self.a, self.b
+        if a < 0 or b < 0:
+            raise ValueError(f"Problem ids need non-negative operands: {self}")
+        pair = a * a + a + b if a >= b else b * b + a
+        return pair * len(OPERATORS) + OPERATORS.index(self.op)
+
+    @property
+    def problem(self) -> str:
+        return f'{self.a} {self.op} {self.b}'
+
+
+@lru_cache(maxsize=None)
+def _parse_problem(problem: str) -> Problem:
+    a, op, b = problem.split()
+    return Problem(op, int(a), int(b))
+
+
+@lru_cache(maxsize=None)
+def _problem_from_id(problem_id: int) -> Problem:
+    pair, op_index = divmod(problem_id, len(OPERATORS))
+    root = isqrt(pair)
+    rest = pair - root * root
+    a, b = (rest, root) if rest < root else (root, rest - root)
+    return Problem(OPERATORS[op_index], a, b)
+
+
+@lru_cache(maxsize=None)
+def intern_problem(problem: str) -> int:
+    """Return the integer id of a problem display string."""
+    return _parse_problem(problem).id
+
+
+def structure_record(entry: Dict) -> Dict:
+    """
+    Add the structured op, a, b and problem_id fields to a history record.
+
+    Records written before these fields existed only carry the problem string;
+    they are upgraded in place so the rest of the code can rely on the fields.
+    """
+    if 'problem_id' not in entry:
+        problem = Problem.parse(entry['problem'])
+        entry['op'], entry['a'], entry['b'] = problem
+        entry['problem_id'] = problem.id
+    return entry
+
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_MISSING_TIMESTAMP_US = (datetime(1900, 1, 1) - _EPOCH) // _MICROSECOND  # stands in for entries without one
+
+
+class LeaderboardEntry:
+    """
+    One leaderboard game, parsed once when it is loaded.
+
+    The timestamp is kept as integer microseconds since the epoch and the user and
+    fact type are interned strings, so entries are compact and never re-parsed.
+    to_dict() reproduces the stored JSON, and dict-style reads such as
+    entry['feathers'] or entry.get('fact_type', 'N/A') still work.
+    """
+    __slots__ = ('user', 'feathers', 'level', 'fact_type', 'timestamp_us', 'extra')
+    FIELDS = ('user', 'feathers', 'level', 'fact_type', 'timestamp')
+
+    def __init__(self, user: str, feathers: int, level: int, fact_type: str = None,
+                 timestamp_us: int = None, extra: Dict = None):
+        self.user = sys.intern(user)
+        self.feathers = feathers
+        self.level = level
+        self.fact_type = None if fact_type is None else sys.intern(fact_type)
+        self.timestamp_us = timestamp_us
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, entry: Dict) -> 'LeaderboardEntry':
+        if isinstance(entry, cls):
+            return entry
+        timestamp = entry.get('timestamp')
+        extra = {key: value for key, value in entry.items() if key not in cls.FIELDS} or None
+        return cls(entry['user'], entry.get('feathers', 0), entry.get('level'), entry.get('fact_type'),
+                   None if timestamp is None else (datetime.fromisoformat(timestamp) - _EPOCH) // _MICROSECOND,
+                   extra)
+
+    @classmethod
+    def now(cls, user: str, feathers: int, level: int, fact_type: str) -> 'LeaderboardEntry':
+        return cls(user, feathers, level, fact_type, (datetime.now() - _EPOCH) // _MICROSECOND)
+
+    def to_dict(self) -> Dict:
+        entry = {'user': self.user, 'feathers': self.feathers, 'level': self.level}
+        if self.fact_type is not None:
+            entry['fact_type'] = self.fact_type
+        if self.timestamp_us is not None:
+            entry['timestamp'] = self.timestamp
+        if self.extra:
+            entry.update(self.extra)
+        return entry
+
+    @property
+    def _timestamp_us(self) -> int:
+        return _MISSING_TIMESTAMP_US if self.timestamp_us is None else self.timestamp_us
+
+    @property
+    def datetime(self) -> datetime:
+        return _EPOCH + timedelta(microseconds=self._timestamp_us)
+
+    @property
+    def day(self) -> int:
+        """The entry's date as an ordinal, computed without building a datetime."""
+        return _EPOCH.toordinal() + self._timestamp_us // 86400000000
+
+    @property
+    def timestamp(self) -> str:
+        return self.datetime.isoformat()
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'timestamp':
+            if self.timestamp_us is None:
+                raise KeyError(key)
+            return self.timestamp
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            if value is None and key == 'fact_type':
+                raise KeyError(key)
+            return value
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.to_dict()})"
@@ -1,28 +1,216 @@
 import json
-from datetime import datetime
-from typing import List, Dict
+from collections import deque
+from datetime import datetime, date
+from typing import Callable, Dict, Iterable, Iterator, List, Union
 import os
-from math_tutor.data import Performance
+from math_tutor import metrics
+from math_tutor.data import Performance, Problem, structure_record
+from math_tutor.logs.journal import JournalStore, append_json_record, append_json_records, journal_signature, read_json_records
+from math_tutor.utils import iter_json_records, scan_json_records
 
-class Historian:
-    def __init__(self, filename: str):
-        self.filename = filename
-        self.history = []
-        self.load()
 
+class HistoryQuery:
+    """
+    Lazy, composable filter over history records.
+
+    Each filter method returns a new query; nothing is read until the query is
+    iterated, and records are then streamed one at a time from the source.
+
+    Example:
+        history.query().user('Ada').operator('x').since(date(2024, 9, 1))
+    """
+    def __init__(self, source: Callable[[], Iterable[Dict]], predicates: tuple = ()):
+        self._source = source
+        self._predicates = predicates
+
+    def where(self, predicate: Callable[[Dict], bool]) -> 'HistoryQuery':
+        """Return a new query that also requires predicate(record) to be true."""
+        return HistoryQuery(self._source, self._predicates + (predicate,))
+
+    def user(self, user: str) -> 'HistoryQuery':
+        return self.where(lambda entry: entry['user'] == user)
+
+    def operator(self, operator: str) -> 'HistoryQuery':
+        return self.where(lambda entry: entry['op'] == operator)
+
+    def problem(self, problem: str) -> 'HistoryQuery':
+        problem_id = Problem.parse(problem).id
+        return self.where(lambda entry: entry['problem_id'] == problem_id)
+
+    def correct(self, correct: bool = True) -> 'HistoryQuery':
+        return self.where(lambda entry: bool(entry['correct']) == correct)
+
+    def since(self, start: Union[date, datetime]) -> 'HistoryQuery':
+        """Keep records timestamped at or after start (a date means midnight)."""
+        start = _as_datetime(start)
+        return self.where(lambda entry: datetime.fromisoformat(entry['timestamp']) >= start)
+
+    def until(self, end: Union[date, datetime]) -> 'HistoryQuery':
+        """Keep records timestamped before end (a date means midnight)."""
+        end = _as_datetime(end)
+        return self.where(lambda entry: datetime.fromisoformat(entry['timestamp']) < end)
+
+    def __iter__(self) -> Iterator[Dict]:
+        predicates = self._predicates
+        for entry in self._source():
+            if all(predicate(entry) for predicate in predicates):
+                yield entry
+
+    def problems(self) -> Iterator[str]:
+        return (entry['problem'] for entry in self)
+
+    def count(self) -> int:
+        return sum(1 for _ in self)
+
+
+def _as_datetime(value: Union[date, datetime]) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.combine(value, datetime.min.time())
+
+
+def record_level(entry: Dict) -> int:
+    """
+    The level a record counts towards: the largest operand, or for division the
+    larger of divisor and quotient (56 / 7 is level 8), which is what a fact
+    library's max_operand limits.
+    """
+    a, b = entry['a'], entry['b']
+    if entry['op'] == '/':
+        return max(b, a // b) if b else a
+    return max(a, b)
+
+
+class HistoryAggregates:
+    """
+    Per-user running tallies the reports are computed from.
+
+    Folding a record in is O(1), and the tallies are small enough to be saved as
+    a snapshot, so reports never need to rescan the raw history.
+    """
+    def __init__(self):
+        self.count = 0
+        self.outcomes = {}  # user -> {problem_id: [right, wrong]}
+        self.card = {}  # user -> {operator: {level: [correct, count]}}
+
+    def add(self, entry: Dict):
+        self.count += 1
+        user = entry['user']
+        outcome = self.outcomes.setdefault(user, {}).setdefault(entry['problem_id'], [0, 0])
+        outcome[0 if bool(entry['correct']) else 1] += 1
+        level = record_level(entry)
+        tally = self.card.setdefault(user, {}).setdefault(entry['op'], {}).setdefault(level, [0, 0])
+        tally[0] += entry['correct']
+        tally[1] += 1
+
+    def extend(self, entries: Iterable[Dict]):
+        for entry in entries:
+            self.add(entry)
+
+    def to_dict(self) -> Dict:
+        return {'count': self.count, 'outcomes': self.outcomes, 'card': self.card}
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'HistoryAggregates':
+        aggregates = cls()
+        aggregates.count = state['count']
+        aggregates.outcomes = {
+            user: {int(problem_id): outcome for problem_id, outcome in outcomes.items()}
+            for user, outcomes in state['outcomes'].items()
+        }
+        aggregates.card = {
+            user: {operator: {int(level): tally for level, tally in levels.items()} for operator, levels in card.items()}
+            for user, card in state['card'].items()
+        }
+        return aggregates
+
+
+class Historian(JournalStore):
+    aggregates_class = HistoryAggregates
+    parse_record = staticmethod(structure_record)
+    metrics_name = 'historian'
+
+    def __init__(self, filename: str, history: List[Dict] = None, snapshot: bool = False, snapshot_every: int = 100,
+                 max_history: int = None):
+        """
+        Args:
+            filename (str): The history file, a JSON array that entries are appended to.
+            history (list): Records to use instead of loading the file.
+            snapshot (bool): Keep only the derived aggregates in memory. They are loaded
+                from a snapshot next to the history file and only records appended after
+                the snapshot are replayed, so startup does not depend on history length.
+            snapshot_every (int): In snapshot mode, refresh the snapshot once this many
+                records have been replayed on top of it.
+            max_history (int): Keep only the most recent max_history raw records in memory
+                (a ring buffer) for long-running processes. Reports still come from the
+                full aggregates, and every record stays in the history file on disk.
+        """
+        super().__init__(filename, snapshot=snapshot, snapshot_every=snapshot_every)
+        self.max_history = max_history
+        self.history = self._new_history()
+        if history is not None:
+            self.history = self._new_history(structure_record(entry) for entry in history)
+            self.aggregates.extend(self.history)
+        else:
+            self.load()
+
+    @metrics.timed('historian.load')
     def load(self) -> List[Dict]:
         """Load leaderboard data from the JSON file."""
+        if self.snapshot:
+            return self._load_snapshot()
+
         if not os.path.exists(self.filename):
             return []  # Return empty list if the file doesn't exist
 
+        if self.max_history:
+            return self._load_bounded()
+
+        signature = journal_signature(self.filename)
+        try:
+            records, self._offset = read_json_records(self.filename)
+        except IOError:
+            return []  # Return empty list if the file can't be read
+        self.history = [structure_record(entry) for entry in records]
+        self.aggregates = HistoryAggregates()
+        self.aggregates.extend(self.history)
+        self._mark_read(signature)
+
+    def _new_history(self, entries: Iterable[Dict] = ()) -> Union[List[Dict], deque]:
+        if self.max_history:
+            return deque(entries, maxlen=self.max_history)
+        return list(entries)
+
+    def _load_bounded(self):
+        """Stream the file once, folding every record into the aggregates and keeping only the newest raw records."""
+        self.history = self._new_history()
+        self.aggregates = HistoryAggregates()
+        self._offset = 0
+        signature = journal_signature(self.filename)
         try:
-            with open(self.filename, 'r') as file:
-                self.history = json.load(file)
+            for entry, end in scan_json_records(self.filename):
+                entry = structure_record(entry)
+                self.history.append(entry)
+                self.aggregates.add(entry)
+                self._offset = end
         except (json.JSONDecodeError, IOError):
-            return []  # Return empty list if JSON is invalid or another IOError occurs
+            pass  # Keep whatever was read before the bad record
+        self._mark_read(signature)
+
+    def _reload(self):
+        self.load()
+
+    def _add_record(self, entry: Dict, end: int):
+        self.aggregates.add(entry)
+        if self.max_history or not self.snapshot:
+            self.history.append(entry)
 
+    @metrics.timed('historian.save')
     def save(self):
         """Save leaderboard data to the JSON file."""
+        if self.snapshot or self.max_history:
+            return  # Entries are appended as they are added; this instance holds only part of the history
+
         # Use a temporary file to avoid overwriting until successful
         temp_filename = self.filename + '.tmp'
 
@@ -32,57 +220,87 @@ class Historian:
         # Only replace the original file if the temporary file was created successfully
         os.replace(temp_filename, self.filename)
 
-    def add_entry(self, entry: Performance):
-        """Add a new entry to the leaderboard."""
-        entry = {
+    @staticmethod
+    def make_record(entry: Performance, timestamp: datetime = None) -> Dict:
+        """Build the history record for a Performance."""
+        problem = Problem.parse(entry.problem)
+        return {
             'user': entry.user,
             'correct': entry.correct,
             'answer': entry.answer,
+            'timing': None if entry.timing is None else round(entry.timing, 3),
             'problem': entry.problem,
-            'timestamp': datetime.now().isoformat()
+            'op': problem.op,
+            'a': problem.a,
+            'b': problem.b,
+            'problem_id': problem.id,
+            'timestamp': (timestamp or datetime.now()).isoformat()
         }
-        self.history.append(entry)
-        self.save()
-    
+
+    @metrics.timed('historian.add_entry')
+    def add_entry(self, entry: Performance):
+        """Add a new entry to the leaderboard."""
+        # Append in place rather than rewriting the whole file
+        append_json_record(self.filename, self.make_record(entry))
+        self.refresh()  # reads the entry back along with any appended by other instances
+
+    @metrics.timed('historian.add_entries')
+    def add_entries(self, entries: Iterable[Performance]) -> int:
+        """
+        Add many entries with a single append (one write and fsync), e.g. a batch of graded answer sheets.
+
+        Returns:
+            The number of entries added.
+        """
+        timestamp = datetime.now()
+        records = [self.make_record(entry, timestamp) for entry in entries]
+        if records:
+            append_json_records(self.filename, records)
+            self.refresh()
+        return len(records)
+
+    def query(self, from_disk: bool = None) -> HistoryQuery:
+        """
+        Start a lazy query over the history.
+
+        Args:
+            from_disk (bool): Stream records straight from the history file instead
+                of the in-memory list, so huge histories are scanned in constant memory.
+                Defaults to True in snapshot and bounded modes, where the raw records are
+                not all in memory.
+        """
+        if from_disk is None:
+            from_disk = self.snapshot or bool(self.max_history)
+        if from_disk:
+            return HistoryQuery(self._iter_file)
+        return HistoryQuery(lambda: iter(self.history))
+
+    def _iter_file(self) -> Iterator[Dict]:
+        if not os.path.exists(self.filename):
+            return iter(())
+        return map(structure_record, iter_json_records(self.filename))
+
+    def problem_outcomes(self, user) -> Dict[int, List[int]]:
+        """Map of problem_id -> [right, wrong] for one user."""
+        return self.aggregates.outcomes.get(user, {})
+
     def challenge_problems(self, user):
-        wrong_problems = [entry['problem'] for entry in self.history if not bool(entry['correct']) and entry['user'] == user]
-        right_problems = [entry['problem'] for entry in self.history if bool(entry['correct']) and entry['user'] == user]
-        
         problems = {}
-        unique_missed_problems = set(wrong_problems)
-        for problem in unique_missed_problems:
-            problems[problem] = {'right': 0, 'wrong': 0}
-
-        for problem in wrong_problems:
-            problems[problem]['wrong'] += 1
-
-        for problem in right_problems:
-            if problem in unique_missed_problems:
-                problems[problem]['right'] += 1
-        
-        for problem in unique_missed_problems:
-            problems[problem]['wrong_rate'] = problems[problem]['wrong'] / (problems[problem]['wrong'] + problems[problem]['right'])
-
-        for problem in unique_missed_problems:
-            if problems[problem]['wrong_rate'] < 0.2:
-                del problems[problem]
-        
-        return sorted(problems, key=lambda k: problems[k]['wrong_rate'], reverse=True)
+        for problem_id, (right, wrong) in self.aggregates.outcomes.get(user, {}).items():
+            if wrong:
+                problems[problem_id] = {'right': right, 'wrong': wrong, 'wrong_rate': wrong / (wrong + right)}
+
+        for problem_id in list(problems):
+            if problems[problem_id]['wrong_rate'] < 0.2:
+                del problems[problem_id]
+
+        ranked = sorted(problems, key=lambda k: problems[k]['wrong_rate'], reverse=True)
+        return [Problem.from_id(problem_id).problem for problem_id in ranked]
 
     def report_card(self, user):
-        user_history = [entry for entry in self.history if entry['user'] == user]
-        user_digest = [(entry['problem'].split(), entry['correct']) for entry in user_history]
         summary = {}
-        for problem, correctness in user_digest:
-            operand = (problem[0], problem[2])
-            operator = problem[1]
-            oper = max(operand)
-            if operator not in summary:
-                summary[operator] = {}
-            if oper not in summary[operator]:
-                summary[operator][oper] = {'rate': 0, 'count': 0}
-            item = summary[operator][oper]
-            summary[operator][oper] = {'rate': (item['rate'] * item['count'] + correctness) / (item['count'] + 1), 'count': item['count'] + 1}
+        for operator, levels in self.aggregates.card.get(user, {}).items():
+            summary[operator] = {level: {'rate': correct / count, 'count': count} for level, (correct, count) in levels.items()}
         return summary
     # TODO: handle division, maybe subtraction more parallel to addition, multiplication
 
@@ -91,12 +309,13 @@ class Historian:
         card = self.report_card(user)
         for level in range(min_level[operator], max_level):
             try:
-                if card[operator][str(level)]['rate'] < min_rate:
+                if card[operator][level]['rate'] < min_rate:
                     break
             except:
                 return level
         return level
 
+    @metrics.timed('report.levels')
     def report_levels(self, user=None, min_rate=0.9, max_level=15):
         user = user or input("Enter a user name for personal bests: ")
         print(f"\n{'Operator':<10} {'Level':<7}")
@@ -107,5 +326,5 @@ class Historian:
 
     @property
     def users(self) -> List:
-        return list(set([entry['user'] for entry in self.leaderboard_data]))
+        return list(self.aggregates.outcomes)
     
\ No newline at end of file
@@ -0,0 +1,280 @@
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+from math_tutor import metrics
+from math_tutor.utils import scan_json_records
+
+ANCHOR_BYTES = 64
+
+
+def append_json_record(filename: str, entry: Dict) -> int:
+    """
+    Append one record to a JSON array file in place and return the new end offset of the records.
+
+    The record is written exactly as json.dump(..., indent=4) would lay it out,
+    so appending never rewrites earlier records and their byte offsets stay valid.
+    """
+    return append_json_records(filename, [entry])
+
+
+def append_json_records(filename: str, entries: Iterable[Dict]) -> int:
+    """
+    Append many records to a JSON array file with a single write and fsync.
+
+    Returns the new end offset of the records (the current one if entries is empty).
+    """
+    text = b',\n    '.join(json.dumps(entry, indent=4).replace('\n', '\n    ').encode('utf-8') for entry in entries)
+    if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+        if not text:
+            return 0
+        with open(filename, 'wb') as file:
+            file.write(b'[\n    ' + text + b'\n]')
+        return len(b'[\n    ' + text)
+
+    with open(filename, 'r+b') as file:
+        end, empty = _last_record_end(file)
+        if end is None:
+            raise ValueError(f"{filename} is not a JSON array")
+        if not text:
+            return end
+        # Writing from the end of the last complete record also drops whatever a torn append left behind
+        file.seek(end)
+        file.write((b'\n    ' if empty else b',\n    ') + text + b'\n]')
+        end = file.tell() - 2
+        file.truncate()
+        file.flush()
+        os.fsync(file.fileno())
+    return end
+
+
+def _last_record_end(file) -> Tuple[Optional[int], bool]:
+    """
+    Find the byte offset just past the last complete record of a JSON array file
+    laid out like json.dump(..., indent=4), and whether the array has no records.
+
+    An intact file ends with the last record's "}" and the closing "]". If an append
+    died part way, the closing bracket is missing; the file is then searched backwards
+    for the last record's closing brace, the only "}" indented by exactly four spaces. Returns (None, False) if
+    the file does not look like a JSON array.
+    """
+    file.seek(0, os.SEEK_END)
+    position = file.tell()
+    tail = b''
+    while True:
+        start = max(0, position - ANCHOR_BYTES * 4)
+        file.seek(start)
+        tail = file.read(position - start) + tail
+        position = start
+        stripped = tail.rstrip()
+        if stripped.endswith(b']'):
+            body = stripped[:-1].rstrip()
+            if body.endswith(b'}') or (start == 0 and body == b'['):
+                return start + len(body), not body.endswith(b'}')
+        closing = tail.rfind(b'\n    }')
+        if closing >= 0:
+            return start + closing + len(b'\n    }'), False
+        if start == 0:
+            opening = tail.find(b'[')
+            return (None, False) if opening < 0 else (opening + 1, True)
+
+
+def journal_signature(filename: str) -> Optional[Tuple[int, int]]:
+    """Return the (size, mtime) of a journal, or None if it does not exist; it changes on every append."""
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def records_end(data: bytes) -> int:
+    """Return the byte offset just past the last record in the contents of a JSON array file."""
+    closing = data.rstrip().rfind(b']')
+    return len(data[:closing].rstrip())
+
+
+def read_json_records(filename: str) -> Tuple[List[Dict], int]:
+    """
+    Load every record of a JSON array file and the byte offset just past the last one.
+
+    A file left unterminated by an interrupted append still yields its complete
+    records; the next append cuts the torn one off.
+    """
+    with open(filename, 'rb') as file:
+        data = file.read()
+    try:
+        return json.loads(data), records_end(data)
+    except json.JSONDecodeError:
+        records, end = [], 0
+        try:
+            for record, end in scan_json_records(filename):
+                records.append(record)
+        except json.JSONDecodeError:
+            pass  # The torn record
+        return records, end
+
+
+def snapshot_filename(filename: str) -> str:
+    return filename + '.snapshot'
+
+
+def read_anchor(filename: str, offset: int) -> Optional[str]:
+    """Return the bytes just before offset, used to check that a snapshot still matches its journal."""
+    if not os.path.exists(filename) or os.path.getsize(filename) < offset:
+        return None
+    with open(filename, 'rb') as file:
+        file.seek(max(0, offset - ANCHOR_BYTES))
+        return file.read(min(offset, ANCHOR_BYTES)).decode('utf-8', errors='replace')
+
+
+def save_snapshot(filename: str, state: Dict, offset: int, count: int):
+    """
+    Save derived state next to the journal together with the journal position it covers.
+
+    Args:
+        filename (str): The journal (data file) the state was derived from.
+        state (dict): JSON-serializable derived state.
+        offset (int): Byte offset just past the last record folded into the state.
+        count (int): Number of records folded into the state.
+    """
+    snapshot = {
+        'offset': offset,
+        'count': count,
+        'anchor': read_anchor(filename, offset),
+        'state': state,
+    }
+    temp_filename = snapshot_filename(filename) + '.tmp'
+    with open(temp_filename, 'w') as file:
+        json.dump(snapshot, file)
+    os.replace(temp_filename, snapshot_filename(filename))
+
+
+def load_snapshot(filename: str) -> Optional[Dict]:
+    """
+    Load the snapshot for a journal, or None if it is missing or no longer matches the journal.
+
+    A snapshot is stale when the journal was rewritten or truncated so the bytes
+    before the recorded offset changed; callers then rebuild from the full journal.
+    """
+    try:
+        with open(snapshot_filename(filename), 'r') as file:
+            snapshot = json.load(file)
+    except (json.JSONDecodeError, IOError):
+        return None
+    if read_anchor(filename, snapshot['offset']) != snapshot['anchor']:
+        return None
+    return snapshot
+
+
+def write_json_records(filename: str, records: Iterable[Dict]) -> int:
+    """
+    Stream records into a new JSON array file laid out like json.dump(..., indent=4).
+
+    Records are written one at a time, so the input can be any iterator. The file
+    is only replaced once writing has finished. Returns the number of records written.
+    """
+    temp_filename = filename + '.tmp'
+    count = 0
+    with open(temp_filename, 'w') as file:
+        file.write('[')
+        for record in records:
+            file.write(',\n    ' if count else '\n    ')
+            file.write(json.dumps(record, indent=4).replace('\n', '\n    '))
+            count += 1
+        file.write('\n]' if count else ']')
+    os.replace(temp_filename, filename)
+    return count
+
+
+class JournalStore:
+    """
+    Base for stores backed by a journal: a JSON array file that records are only
+    ever appended to, with running aggregates derived from the records.
+
+    It tracks how far the file has been folded into the aggregates (a byte offset,
+    the anchor bytes before it and the file's size and mtime), so refresh() reads
+    only appended records and snapshot mode restores the aggregates from a snapshot
+    plus the journal tail. Subclasses set aggregates_class and parse_record, fold
+    each record in _add_record and read the file from scratch in _reload.
+    """
+    aggregates_class = None  # has add(), to_dict(), from_dict() and a count
+    metrics_name = 'journal'
+
+    def __init__(self, filename: str, snapshot: bool = False, snapshot_every: int = 100):
+        self.filename = filename
+        self.snapshot = snapshot
+        self.snapshot_every = snapshot_every
+        self.aggregates = self.aggregates_class()
+        self._offset = 0  # bytes of the file folded into the aggregates
+        self._anchor = None  # bytes just before _offset, to notice the file being rewritten
+        self._signature = None  # size and mtime of the file when it was last read
+        self._unsnapshotted = 0
+
+    @staticmethod
+    def parse_record(record: Dict):
+        return record
+
+    def _add_record(self, entry, end: int):
+        """Fold one parsed record, ending at byte offset end, into the store."""
+        self.aggregates.add(entry)
+
+    def _reload(self):
+        raise NotImplementedError
+
+    def _mark_read(self, signature):
+        """Remember how far the file has been read, so refresh() can skip or resume from there."""
+        self._signature = signature
+        self._anchor = read_anchor(self.filename, self._offset)
+
+    def refresh(self) -> int:
+        """
+        Pick up records appended to the file since it was last read, for example
+        by another instance or another process.
+
+        Nothing is read when the file's size and mtime are unchanged, and otherwise
+        only the appended bytes are parsed. A file that was rewritten or truncated
+        is loaded again in full.
+
+        Returns:
+            The number of records read.
+        """
+        if self.filename is None or journal_signature(self.filename) == self._signature:
+            return 0
+        if read_anchor(self.filename, self._offset) != self._anchor:
+            self._reload()
+            return self.aggregates.count
+        count = self.aggregates.count
+        self._replay_tail()
+        return self.aggregates.count - count
+
+    def _load_snapshot(self):
+        """Restore the aggregates from the snapshot, then replay the journal tail."""
+        snapshot = load_snapshot(self.filename)
+        if snapshot is None:
+            self.aggregates, self._offset = self.aggregates_class(), 0
+        else:
+            self.aggregates, self._offset = self.aggregates_class.from_dict(snapshot['state']), snapshot['offset']
+        self._unsnapshotted = 0
+        self._replay_tail()
+
+    def _replay_tail(self):
+        """Fold records appended past the last known offset into the store."""
+        if not os.path.exists(self.filename):
+            return
+        signature = journal_signature(self.filename)
+        try:
+            for record, end in scan_json_records(self.filename, offset=self._offset):
+                self._add_record(self.parse_record(record), end)
+                self._offset = end
+                self._unsnapshotted += 1
+        except json.JSONDecodeError:
+            pass  # A record still being written; pick it up next time
+        self._mark_read(signature)
+        if self.snapshot and self._unsnapshotted >= self.snapshot_every:
+            self.save_snapshot()
+
+    def save_snapshot(self):
+        """Write the aggregates next to the file with the offset they cover."""
+        with metrics.timer(f'{self.metrics_name}.save_snapshot'):
+            save_snapshot(self.filename, self.aggregates.to_dict(), self._offset, self.aggregates.count)
+        self._unsnapshotted = 0
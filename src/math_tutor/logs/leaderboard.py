@@ -1,57 +1,265 @@
 import json
-from datetime import datetime, timedelta
-from typing import List, Dict
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Dict
 import os
 import statistics
+from bisect import bisect_left, bisect_right
 from collections import OrderedDict
+from math_tutor import metrics
+from math_tutor.data import LeaderboardEntry
+from math_tutor.logs.journal import JournalStore, append_json_record, journal_signature, read_json_records
 
 def main(user=None):
-    leaderboard = Leaderboard('egghunt_leaders.json')
+    from math_tutor.logs.shards import open_leaderboard  # shards builds on this module
+    leaderboard = open_leaderboard('egghunt_leaders.json')
     leaderboard.user_dashboard(user)
 
-class Leaderboard:
-    def __init__(self, filename: str, user=None):
-        self.filename = filename
-        self.leaderboard_data = self.load()
+class RankIndex:
+    """
+    Leaderboard entries kept in descending order of feathers (ties in insertion order).
+
+    The entries are split into sorted blocks of at most 2 * block_size, with the
+    last key of each block kept in a separate list. An insert bisects that list to
+    find its block, then bisects and inserts within the block. It costs
+    O(log n + block_size) rather than O(n), and a full block is split in two.
+    Top-k reads walk the first blocks, and rank lookups are two bisects plus a
+    sum over the preceding blocks' lengths.
+    """
+    block_size = 512
+
+    def __init__(self, entries: List[LeaderboardEntry] = None):
+        entries = sorted(entries or [], key=lambda x: x.feathers, reverse=True)
+        self._entries = [entries[start:start + self.block_size] for start in range(0, len(entries), self.block_size)]
+        self._keys = [[-entry.feathers for entry in block] for block in self._entries]
+        self._last_keys = [keys[-1] for keys in self._keys]
+        self._len = len(entries)
+
+    def add(self, entry: LeaderboardEntry):
+        key = -entry.feathers
+        self._len += 1
+        if not self._keys:
+            self._entries.append([entry])
+            self._keys.append([key])
+            self._last_keys.append(key)
+            return
+        # Every block before the first one with a larger last key holds only keys <= key
+        block = min(bisect_right(self._last_keys, key), len(self._keys) - 1)
+        keys, entries = self._keys[block], self._entries[block]
+        position = bisect_right(keys, key)
+        keys.insert(position, key)
+        entries.insert(position, entry)
+        self._last_keys[block] = keys[-1]
+        if len(keys) > 2 * self.block_size:
+            half = self.block_size
+            self._keys[block + 1:block + 1] = [keys[half:]]
+            self._entries[block + 1:block + 1] = [entries[half:]]
+            del keys[half:], entries[half:]
+            self._last_keys[block:block + 1] = [keys[-1], self._keys[block + 1][-1]]
+
+    def top(self, k: int = None) -> List[LeaderboardEntry]:
+        top = []
+        for entries in self._entries:
+            if k is not None and len(top) >= k:
+                break
+            top.extend(entries)
+        return top[:k]
+
+    def rank_of(self, feathers: int) -> int:
+        """Return the 1-based rank a score of feathers holds (ties share a rank)."""
+        key = -feathers
+        block = bisect_left(self._last_keys, key)
+        ahead = sum(len(keys) for keys in self._keys[:block])
+        if block < len(self._keys):
+            ahead += bisect_left(self._keys[block], key)
+        return ahead + 1
+
+    def __len__(self) -> int:
+        return self._len
+
+
+class LeaderboardAggregates:
+    """Per-user totals and active dates, the state behind streaks and all-time leaders."""
+    def __init__(self):
+        self.count = 0
+        self.totals = {}  # user -> total feathers
+        self.dates = {}  # user -> set of date ordinals with at least one game
+
+    def add(self, entry: LeaderboardEntry):
+        self.count += 1
+        user = entry.user
+        self.totals[user] = self.totals.get(user, 0) + entry.feathers
+        self.dates.setdefault(user, set()).add(entry.day)
+
+    def extend(self, entries: Iterable[LeaderboardEntry]):
+        for entry in entries:
+            self.add(entry)
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'totals': self.totals,
+            'dates': {user: sorted(dates) for user, dates in self.dates.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'LeaderboardAggregates':
+        aggregates = cls()
+        aggregates.count = state['count']
+        aggregates.totals = dict(state['totals'])
+        aggregates.dates = {user: set(dates) for user, dates in state['dates'].items()}
+        return aggregates
+
+
+class Leaderboard(JournalStore):
+    aggregates_class = LeaderboardAggregates
+    parse_record = staticmethod(LeaderboardEntry.from_dict)
+    metrics_name = 'leaderboard'
+
+    def __init__(self, filename: str, user=None, leaderboard_data: List[Dict] = None,
+                 snapshot: bool = False, snapshot_every: int = 20):
+        """
+        Args:
+            filename (str): The leaderboard file, a JSON array that entries are appended to.
+            user (str): The current user.
+            leaderboard_data (list): Entries to use instead of loading the file.
+            snapshot (bool): Restore totals and streak dates from a snapshot plus the
+                journal tail, and only load the full entries when a ranking needs them.
+            snapshot_every (int): In snapshot mode, refresh the snapshot once this many
+                entries have been replayed on top of it.
+        """
+        super().__init__(filename, snapshot=snapshot, snapshot_every=snapshot_every)
         self.user = user
+        self._leaderboard_data = None if leaderboard_data is None else [LeaderboardEntry.from_dict(entry) for entry in leaderboard_data]
+        self._indexes = None
+        self._data_offset = 0  # bytes of the leaderboard file loaded into leaderboard_data
+        if leaderboard_data is None:
+            self._reload()
+        else:
+            self.aggregates.extend(self._leaderboard_data)
+
+    def _reload(self):
+        """Read the leaderboard file from scratch (just the snapshot and its tail in snapshot mode)."""
+        self._leaderboard_data = None
+        self._indexes = None
+        self._data_offset = 0
+        if self.snapshot:
+            self._load_snapshot()
+            return
+        signature = journal_signature(self.filename)
+        self.aggregates = LeaderboardAggregates()
+        self.aggregates.extend(self.leaderboard_data)
+        self._offset = self._data_offset
+        self._mark_read(signature)
 
-    def load(self) -> List[Dict]:
+    @property
+    def leaderboard_data(self) -> List[LeaderboardEntry]:
+        if self._leaderboard_data is None:
+            self._leaderboard_data = self.load()
+        return self._leaderboard_data
+
+    @leaderboard_data.setter
+    def leaderboard_data(self, leaderboard_data: List[Dict]):
+        self._leaderboard_data = [LeaderboardEntry.from_dict(entry) for entry in leaderboard_data]
+        self._indexes = None
+        self.aggregates = LeaderboardAggregates()
+        self.aggregates.extend(self._leaderboard_data)
+
+    def _add_record(self, entry: LeaderboardEntry, end: int):
+        self.aggregates.add(entry)
+        if self._leaderboard_data is not None and end > self._data_offset:
+            self._insert(entry)
+            self._data_offset = end
+
+    def _insert(self, entry: LeaderboardEntry):
+        """Add an entry to the loaded entries and to each rank index already built."""
+        self._leaderboard_data.append(entry)
+        if self._indexes is not None:
+            for scope in self._scopes(entry):
+                self._indexes.setdefault(scope, RankIndex()).add(entry)
+
+    @metrics.timed('leaderboard.build_indexes')
+    def build_indexes(self):
+        """Build the global, per-user, per-fact-type and per-user-and-fact-type rank indexes."""
+        groups = {None: self.leaderboard_data}
+        for entry in self.leaderboard_data:
+            for scope in self._scopes(entry)[1:]:
+                groups.setdefault(scope, []).append(entry)
+        self._indexes = {scope: RankIndex(entries) for scope, entries in groups.items()}
+
+    @staticmethod
+    def _scopes(entry: LeaderboardEntry) -> tuple:
+        fact_type = entry.fact_type or 'N/A'
+        return (None, ('user', entry.user), ('fact_type', fact_type), ('user', entry.user, 'fact_type', fact_type))
+
+    @staticmethod
+    def _scope(user: str = None, fact_type: str = None) -> tuple:
+        if user and fact_type:
+            return ('user', user, 'fact_type', fact_type)
+        if user:
+            return ('user', user)
+        if fact_type:
+            return ('fact_type', fact_type)
+        return None
+
+    def _index(self, user: str = None, fact_type: str = None) -> RankIndex:
+        if self._indexes is None:
+            self.build_indexes()
+        return self._indexes.get(self._scope(user, fact_type)) or RankIndex()
+
+    def rank_of(self, feathers: int, user: str = None, fact_type: str = None) -> int:
+        """
+        Return the rank a score would hold within a scope.
+
+        Args:
+            feathers (int): The score to rank.
+            user (str): Restrict the ranking to this user's games.
+            fact_type (str): Restrict the ranking to games of this fact type.
+        """
+        return self._index(user, fact_type).rank_of(feathers)
+
+    def top(self, k: int = 10, user: str = None, fact_type: str = None) -> List[LeaderboardEntry]:
+        """Return the k highest-scoring entries within a scope."""
+        return self._index(user, fact_type).top(k)
+
+    @metrics.timed('leaderboard.load')
+    def load(self) -> List[LeaderboardEntry]:
         """Load leaderboard data from the JSON file."""
         if not os.path.exists(self.filename):
             return []  # Return empty list if the file doesn't exist
 
         try:
-            with open(self.filename, 'r') as file:
-                return json.load(file)
-        except (json.JSONDecodeError, IOError):
-            return []  # Return empty list if JSON is invalid or another IOError occurs
+            records, self._data_offset = read_json_records(self.filename)
+        except IOError:
+            return []  # Return empty list if the file can't be read
+        return [LeaderboardEntry.from_dict(entry) for entry in records]
 
+    @metrics.timed('leaderboard.save')
     def save(self):
         """Save leaderboard data to the JSON file."""
+        if self.snapshot:
+            return  # Entries are appended as they are added; the snapshot stands in for the rest of the file
+
         # Use a temporary file to avoid overwriting until successful
         temp_filename = self.filename + '.tmp'
 
         with open(temp_filename, 'w') as file:
-            json.dump(self.leaderboard_data, file, indent=4)
+            json.dump([entry.to_dict() for entry in self.leaderboard_data], file, indent=4)
 
         # Only replace the original file if the temporary file was created successfully
         os.replace(temp_filename, self.filename)
 
+    @metrics.timed('leaderboard.add_entry')
     def add_entry(self, user: str, feathers: int, level: int, fact_type: str):
         """Add a new entry to the leaderboard."""
-        entry = {
-            'user': user,
-            'feathers': feathers,
-            'level': level,
-            'fact_type': fact_type,
-            'timestamp': datetime.now().isoformat()
-        }
-        self.leaderboard_data.append(entry)
-        self.save()
+        entry = LeaderboardEntry.now(user, feathers, level, fact_type)
+        # Append in place rather than rewriting the whole file
+        append_json_record(self.filename, entry.to_dict())
+        self.refresh()  # reads the entry back along with any appended by other processes
+        return entry
 
     @property
     def users(self) -> List:
-        return list(set([entry['user'] for entry in self.leaderboard_data]))
+        return list(self.aggregates.totals)
     
     def user_dashboard(self, user=None, fact_type=None):
         self.display_all_time_leaders()
@@ -64,10 +272,20 @@ class Leaderboard:
         self.display_all_time_leaders()
         user = user or input("Enter a user name for personal bests: ")
 
-    def get_leaderboard(self) -> List[Dict]:
+    def get_leaderboard(self) -> List[LeaderboardEntry]:
         """Return the leaderboard data sorted by feathers."""
-        return sorted(self.leaderboard_data, key=lambda x: x['feathers'], reverse=True)
-
+        return self._index().top()
+
+    @metrics.timed('report.rank')
+    def display_rank(self, user: str, feathers: int, fact_type: str = None):
+        """Show where a score ranks all-time, among the user's games and for the fact type."""
+        print(f"\nThis run ranks #{self.rank_of(feathers)} of {len(self._index())} all-time", end='')
+        print(f" and #{self.rank_of(feathers, user=user)} of {len(self._index(user))} of your games", end='')
+        if fact_type:
+            print(f" (#{self.rank_of(feathers, user=user, fact_type=fact_type)} for {fact_type})", end='')
+        print("!")
+
+    @metrics.timed('report.streak')
     def display_streak(self, user: str):
         streak, active = self.streak(user)
         if active is True:
@@ -86,14 +304,11 @@ class Leaderboard:
         if user is None:
             return 0, False
 
-        user_data = [entry for entry in self.leaderboard_data if entry['user'] == user]
-        
-        if not user_data:
+        if user not in self.aggregates.dates:
             return 0, False  # No data for the user
 
-        # Extract timestamps and convert to dates
-        dates = [datetime.fromisoformat(entry['timestamp']).date() for entry in user_data]
-        unique_dates = sorted(set(dates), reverse=True)  # Get unique dates
+        # Active dates are kept as ordinals by the aggregates
+        unique_dates = [date.fromordinal(day) for day in sorted(self.aggregates.dates[user], reverse=True)]
 
         # Check if streak is active
         today = datetime.today().date()
@@ -129,16 +344,15 @@ class Leaderboard:
 
         return streak, active
 
-    def get_leaderboard_by_user(self, user: str) -> List[Dict]:
+    def get_leaderboard_by_user(self, user: str) -> List[LeaderboardEntry]:
         """Return the leaderboard data for a specific user sorted by feathers."""
-        user_data = [entry for entry in self.leaderboard_data if entry['user'] == user]
-        return sorted(user_data, key=lambda x: x['feathers'], reverse=True)[:10]
+        return self.top(10, user=user)
 
-    def get_leaderboard_by_user_and_fact_type(self, user: str, fact_type: str) -> List[Dict]:
+    def get_leaderboard_by_user_and_fact_type(self, user: str, fact_type: str) -> List[LeaderboardEntry]:
         """Return the leaderboard data for a specific user sorted by feathers."""
-        user_data = [entry for entry in self.leaderboard_data if entry['user'] == user and entry['fact_type'] == fact_type]
-        return sorted(user_data, key=lambda x: x['feathers'], reverse=True)[:10]
+        return self.top(10, user=user, fact_type=fact_type)
 
+    @metrics.timed('report.leaderboard')
     def display_leaderboard(self, user: str=None, fact_type: str=None):
         """Display the leaderboard for a specific user in a user-friendly table format."""
         if len(user) == 0 or user is None:
@@ -160,12 +374,12 @@ class Leaderboard:
 
         now = datetime.now()
         for idx, entry in enumerate(leaderboard):
-            if entry['feathers'] != last_score:
+            if entry.feathers != last_score:
                 current_rank = idx + 1  # Rank starts from 1
-                last_score = entry['feathers']
+                last_score = entry.feathers
 
             # Check if the entry is the most recent
-            timestamp_iso = datetime.fromisoformat(entry.get('timestamp', '1900-01-01T00:00:00'))
+            timestamp_iso = entry.datetime
             ts_indicator = 'Just now!' if now - timestamp_iso <= timedelta(seconds=1) else str(timestamp_iso)
 
             # Print the entry using the dictionary
@@ -173,16 +387,8 @@ class Leaderboard:
 
     def get_all_time_leaders(self) -> List[Dict]:
         """Return all-time points leaders based on cumulative points earned."""
-        points_leaders = {}
-
-        # Aggregate points for each user
-        for entry in self.leaderboard_data:
-            user = entry['user']
-            feathers = entry.get('feathers', 0)  # Use feathers as points
-            if user in points_leaders:
-                points_leaders[user] += feathers
-            else:
-                points_leaders[user] = feathers
+        # Points for each user are aggregated as entries are added
+        points_leaders = self.aggregates.totals
 
         # Convert to a list of dictionaries for easier sorting and display
         all_time_leaders = [{'user': user, 'total_points': points} for user, points in points_leaders.items()]
@@ -198,6 +404,7 @@ class Leaderboard:
         # Sort by total points in descending order
         return sorted(all_time_leaders_enhanced, key=lambda x: x['total_points'], reverse=True)
 
+    @metrics.timed('report.all_time_leaders')
     def display_all_time_leaders(self):
         """Display all-time points leaders in a user-friendly table format."""
         try:
@@ -221,12 +428,12 @@ class Leaderboard:
         personal_bests = []
 
         # Filter entries for the specified user
-        user_entries = [entry for entry in self.leaderboard_data if entry['user'] == user]
+        user_entries = [entry for entry in self.leaderboard_data if entry.user == user]
 
         # Find personal bests
         if user_entries:
             # Sort entries by feathers (or whatever metric you consider a "best")
-            best_entry = max(user_entries, key=lambda x: x['feathers'])
+            best_entry = max(user_entries, key=lambda x: x.feathers)
             personal_bests.append({
                 'user': best_entry['user'],
                 'feathers': best_entry['feathers'],
@@ -237,6 +444,7 @@ class Leaderboard:
 
         return personal_bests
 
+    @metrics.timed('report.personal_bests')
     def display_personal_bests(self, user: str):
         """Display personal bests for the specified user in a user-friendly format."""
         personal_bests = self.get_personal_bests(user)
@@ -251,12 +459,12 @@ class Leaderboard:
         else:
             print(f"\nNo entries found for {user}.")
 
-    def get_personal_bests_by_fact_type(self, user: str) -> Dict[str, Dict]:
+    def get_personal_bests_by_fact_type(self, user: str) -> Dict[str, LeaderboardEntry]:
         """Return personal bests for the specified user, grouped by fact type."""
         personal_bests = {}
 
         # Filter entries for the specified user
-        user_entries = [entry for entry in self.leaderboard_data if entry['user'] == user]
+        user_entries = [entry for entry in self.leaderboard_data if entry.user == user]
 
         # Find personal bests for each fact type
         for entry in user_entries:
@@ -265,11 +473,12 @@ class Leaderboard:
                 personal_bests[fact_type] = entry
             else:
                 # Compare and keep the entry with the higher feathers
-                if entry['feathers'] > personal_bests[fact_type]['feathers']:
+                if entry.feathers > personal_bests[fact_type].feathers:
                     personal_bests[fact_type] = entry
 
         return personal_bests
 
+    @metrics.timed('report.personal_bests')
     def display_personal_bests_by_fact_type(self, user: str):
         """Display personal bests for the specified user by fact type in a user-friendly format."""
         personal_bests = self.get_personal_bests_by_fact_type(user)
@@ -290,7 +499,7 @@ class Leaderboard:
         competence = {'addition (+)': {}, 'subtraction (-)': {}, 'multiplication (x)': {}, 'division (/)': {}}
         
         for entry in self.leaderboard_data:
-            if entry['user'] == user:
+            if entry.user == user:
                 if competence[entry['fact_type']].get(entry['level']) is None:
                     competence[entry['fact_type']][entry['level']] = [entry['feathers']]
                 else:
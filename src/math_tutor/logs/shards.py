@@ -0,0 +1,377 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional
+from math_tutor.data import LeaderboardEntry, Performance, structure_record
+from math_tutor.logs.historian import Historian, HistoryQuery
+from math_tutor.logs.journal import append_json_record, write_json_records
+from math_tutor.logs.leaderboard import Leaderboard, RankIndex
+from math_tutor.utils import iter_json_records
+
+
+class ShardDirectory:
+    """
+    Per-user storage for a log file: <filename>.d/ holds one JSON array file per
+    user plus index.json, a small directory mapping each user to their shard.
+
+    Reading the user list only touches the index, and serving one student only
+    touches that student's shard.
+    """
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.directory = filename + '.d'
+        self.index_filename = os.path.join(self.directory, 'index.json')
+        self._index = None
+
+    @property
+    def imported_filename(self) -> str:
+        """Where the single log file is kept once it has been split into shards."""
+        return self.filename + '.imported'
+
+    @staticmethod
+    def exists_for(filename: str) -> bool:
+        return os.path.exists(os.path.join(filename + '.d', 'index.json'))
+
+    @property
+    def index(self) -> Dict[str, str]:
+        """Map of user -> shard file name, read once from index.json."""
+        if self._index is None:
+            try:
+                with open(self.index_filename, 'r') as file:
+                    self._index = json.load(file)['users']
+            except (json.JSONDecodeError, IOError, KeyError):
+                self._index = {}
+        return self._index
+
+    def reload_index(self):
+        self._index = None
+
+    @property
+    def users(self) -> List[str]:
+        return list(self.index)
+
+    def _save_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        temp_filename = self.index_filename + '.tmp'
+        with open(temp_filename, 'w') as file:
+            json.dump({'users': self.index}, file, indent=4)
+        os.replace(temp_filename, self.index_filename)
+
+    @staticmethod
+    def _shard_name(user: str) -> str:
+        slug = re.sub(r'[^A-Za-z0-9_-]+', '_', user)[:40]
+        return f"{slug}-{hashlib.sha1(user.encode('utf-8')).hexdigest()[:8]}.json"
+
+    def shard_filename(self, user: str, create: bool = False) -> Optional[str]:
+        """
+        Return the path of a user's shard, or None if the user has none.
+
+        Args:
+            create (bool): Register a shard for a new user in the index.
+        """
+        if user not in self.index:
+            if not create:
+                return None
+            self.index[user] = self._shard_name(user)
+            self._save_index()
+        return os.path.join(self.directory, self.index[user])
+
+    def append(self, user: str, record: Dict):
+        append_json_record(self.shard_filename(user, create=True), record)
+
+    def iter_records(self, user: str = None) -> Iterator[Dict]:
+        """Stream one user's records, or every user's shard in turn."""
+        users = self.users if user is None else [user]
+        shards = (self.shard_filename(name) for name in users)
+        return chain.from_iterable(iter_json_records(shard) for shard in shards if shard and os.path.exists(shard))
+
+    def import_file(self, filename: str = None) -> int:
+        """
+        Split a single log file into per-user shards.
+
+        The records are grouped by user and each shard is written in one pass into
+        a temporary directory, which is renamed into place before index.json is
+        written. Until the index exists the log is not treated as sharded, so an
+        interrupted import loses nothing and can simply be run again. Once it does,
+        the log file itself is renamed to <filename>.imported, so nothing (such as
+        merge_logs) can keep writing to a copy the games no longer read.
+
+        Returns:
+            The number of records imported.
+        """
+        if os.path.exists(self.index_filename):
+            raise ValueError(f"{self.filename} is already sharded")
+        source = filename or self.filename
+        by_user = {}
+        for record in iter_json_records(source):
+            by_user.setdefault(record['user'], []).append(record)
+
+        temp_directory = self.directory + '.tmp'
+        for leftover in (temp_directory, self.directory):  # from an interrupted import
+            if os.path.exists(leftover):
+                shutil.rmtree(leftover)
+        os.makedirs(temp_directory)
+        index = {}
+        for user, records in by_user.items():
+            index[user] = self._shard_name(user)
+            write_json_records(os.path.join(temp_directory, index[user]), records)
+        os.replace(temp_directory, self.directory)
+
+        self._index = index
+        self._save_index()
+        if os.path.abspath(source) == os.path.abspath(self.filename):
+            os.replace(source, self.imported_filename)
+        return sum(len(records) for records in by_user.values())
+
+
+def iter_store_records(filename: str) -> Iterator[Dict]:
+    """Stream every record of a log, whether it is a single file or a sharded directory."""
+    if ShardDirectory.exists_for(filename):
+        return ShardDirectory(filename).iter_records()
+    if os.path.exists(filename):
+        return iter_json_records(filename)
+    return iter(())
+
+
+class ShardedHistorian(Historian):
+    """
+    Historian over per-user shards: each user's history is loaded into its own
+    Historian only when one of that user's reports is requested.
+    """
+    def __init__(self, filename: str, snapshot: bool = False, snapshot_every: int = 100, max_history: int = None):
+        self.shards = ShardDirectory(filename)
+        self._historians = {}
+        super().__init__(filename, history=[], snapshot=snapshot, snapshot_every=snapshot_every, max_history=max_history)
+
+    def _historian(self, user: str, create: bool = False) -> Historian:
+        """Return the user's Historian; users without a shard get an empty one unless create is set."""
+        historian = self._historians.get(user)
+        if historian is None or (create and historian.filename is None):
+            shard = self.shards.shard_filename(user, create=create)
+            if shard is None:
+                historian = Historian(None, history=[])
+            else:
+                historian = Historian(shard, snapshot=self.snapshot, snapshot_every=self.snapshot_every,
+                                      max_history=self.max_history)
+            self._historians[user] = historian
+        return historian
+
+    def load(self):
+        """Reload the index and the shards of users already in use."""
+        self.shards.reload_index()
+        self._historians = {user: historian for user, historian in self._historians.items() if historian.filename}
+        for historian in self._historians.values():
+            historian.load()
+
+    def save(self):
+        for historian in self._historians.values():
+            if historian.filename:
+                historian.save()
+
+    def save_snapshot(self):
+        for historian in self._historians.values():
+            if historian.filename and historian.snapshot:
+                historian.save_snapshot()
+
+    def refresh(self) -> int:
+        """Reread the index and pick up new records in the shards already in use."""
+        self.shards.reload_index()
+        self._historians = {user: historian for user, historian in self._historians.items() if historian.filename}
+        return sum(historian.refresh() for historian in self._historians.values())
+
+    def add_entry(self, entry: Performance):
+        self._historian(entry.user, create=True).add_entry(entry)
+
+    def add_entries(self, entries: Iterable[Performance]) -> int:
+        """Add many entries with one bulk append per user's shard."""
+        by_user = {}
+        for entry in entries:
+            by_user.setdefault(entry.user, []).append(entry)
+        return sum(self._historian(user, create=True).add_entries(user_entries) for user, user_entries in by_user.items())
+
+    def query(self, from_disk: bool = None) -> HistoryQuery:
+        """Query across every shard; records always stream from disk."""
+        return HistoryQuery(lambda: map(structure_record, self.shards.iter_records()))
+
+    def problem_outcomes(self, user):
+        return self._historian(user).problem_outcomes(user)
+
+    def challenge_problems(self, user):
+        return self._historian(user).challenge_problems(user)
+
+    def report_card(self, user):
+        return self._historian(user).report_card(user)
+
+    @property
+    def users(self) -> List:
+        return self.shards.users
+
+
+class ShardedLeaderboard(Leaderboard):
+    """
+    Leaderboard over per-user shards. Per-user views (streaks, personal bests,
+    the user's own rankings) read only that user's shard; whole-school views load
+    every shard on first use.
+    """
+    def __init__(self, filename: str, user=None, snapshot: bool = False, snapshot_every: int = 20):
+        self.shards = ShardDirectory(filename)
+        self._boards = {}
+        self._combined = None
+        # No entries of its own: every view goes to the per-user boards or the combined board
+        super().__init__(filename, user=user, leaderboard_data=[], snapshot=snapshot, snapshot_every=snapshot_every)
+
+    def _board(self, user: str, create: bool = False) -> Leaderboard:
+        """Return the user's Leaderboard; users without a shard get an empty one unless create is set."""
+        board = self._boards.get(user)
+        if board is None or (create and board.filename is None):
+            shard = self.shards.shard_filename(user, create=create)
+            if shard is None:
+                board = Leaderboard(None, user=user, leaderboard_data=[])
+            else:
+                board = Leaderboard(shard, user=user, snapshot=self.snapshot, snapshot_every=self.snapshot_every)
+            self._boards[user] = board
+        return board
+
+    def _combined_board(self) -> Leaderboard:
+        """A leaderboard over every shard, for whole-school rankings."""
+        if self._combined is None:
+            self._combined = Leaderboard(self.filename, leaderboard_data=list(self.shards.iter_records()))
+        return self._combined
+
+    @property
+    def leaderboard_data(self):
+        return self._combined_board().leaderboard_data
+
+    @leaderboard_data.setter
+    def leaderboard_data(self, leaderboard_data):
+        self._combined = None
+
+    def load(self) -> List[LeaderboardEntry]:
+        return [LeaderboardEntry.from_dict(entry) for entry in self.shards.iter_records()]
+
+    def save(self):
+        for board in self._boards.values():
+            if board.filename:
+                board.save()
+
+    def save_snapshot(self):
+        for board in self._boards.values():
+            if board.filename and board.snapshot:
+                board.save_snapshot()
+
+    def refresh(self) -> int:
+        """Reread the index and pick up new entries in the shards already in use."""
+        self.shards.reload_index()
+        self._boards = {user: board for user, board in self._boards.items() if board.filename}
+        count = sum(board.refresh() for board in self._boards.values())
+        self._combined = None  # whole-school views are rebuilt from the shards on next use
+        return count
+
+    def add_entry(self, user: str, feathers: int, level: int, fact_type: str):
+        entry = self._board(user, create=True).add_entry(user, feathers, level, fact_type)
+        if self._combined is not None:
+            self._combined.aggregates.add(entry)
+            self._combined._insert(entry)
+        return entry
+
+    @property
+    def users(self) -> List:
+        return self.shards.users
+
+    def _index(self, user: str = None, fact_type: str = None) -> RankIndex:
+        if user:
+            return self._board(user)._index(user, fact_type)
+        return self._combined_board()._index(user, fact_type)
+
+    def streak(self, user: str) -> int:
+        if user is None:
+            return 0, False
+        return self._board(user).streak(user)
+
+    def get_all_time_leaders(self) -> List[Dict]:
+        leaders = []
+        for user in self.shards.users:
+            board = self._board(user)
+            days, active = board.streak(user)
+            leaders.append({
+                'user': user,
+                'total_points': board.aggregates.totals.get(user, 0),
+                'streak': days,
+                'active': 'Active' if active else ('Inactive' if active is False else '?'),
+            })
+        return sorted(leaders, key=lambda x: x['total_points'], reverse=True)
+
+    def get_personal_bests(self, user: str) -> List[Dict]:
+        return self._board(user).get_personal_bests(user)
+
+    def get_personal_bests_by_fact_type(self, user: str):
+        return self._board(user).get_personal_bests_by_fact_type(user)
+
+    def get_competence_by_user(self, user: str):
+        return self._board(user).get_competence_by_user(user)
+
+
+_open_stores = {}  # (class, path, options) -> the store shared within this process
+
+
+def _open_store(store_class, filename: str, shared: bool, kwargs: Dict):
+    """Return the process's store for a path and options, brought up to date, or a new private one."""
+    if not shared:
+        return store_class(filename, **kwargs)
+    key = (store_class, os.path.abspath(filename), tuple(sorted(kwargs.items())))
+    store = _open_stores.get(key)
+    if store is None:
+        store = _open_stores[key] = store_class(filename, **kwargs)
+    else:
+        store.refresh()
+    return store
+
+
+def open_historian(filename: str, shared: bool = True, **kwargs) -> Historian:
+    """
+    Open a history log, using the per-user shards when the log has been sharded.
+
+    Args:
+        shared (bool): Reuse the Historian already open on this file (with the same
+            options) in this process, so every module sees one in-memory view.
+    """
+    store_class = ShardedHistorian if ShardDirectory.exists_for(filename) else Historian
+    return _open_store(store_class, filename, shared, kwargs)
+
+
+def open_leaderboard(filename: str, shared: bool = True, **kwargs) -> Leaderboard:
+    """
+    Open a leaderboard, using the per-user shards when the leaderboard has been sharded.
+
+    Args:
+        shared (bool): Reuse the Leaderboard already open on this file (with the same
+            options) in this process.
+    """
+    store_class = ShardedLeaderboard if ShardDirectory.exists_for(filename) else Leaderboard
+    return _open_store(store_class, filename, shared, kwargs)
+
+
+def main():
+    """Split history.json and egghunt_leaders.json into per-user shards."""
+    parser = argparse.ArgumentParser(description="Split log files into per-user shards with a user index.")
+    parser.add_argument('files', nargs='*', default=['history.json', 'egghunt_leaders.json'],
+                        help="Log files to shard (default: history.json egghunt_leaders.json)")
+    args = parser.parse_args()
+    for filename in args.files:
+        if ShardDirectory.exists_for(filename):
+            print(f"{filename} is already sharded.")
+            continue
+        if not os.path.exists(filename):
+            print(f"{filename} not found.")
+            continue
+        shards = ShardDirectory(filename)
+        count = shards.import_file()
+        print(f"Sharded {count} records from {filename} into {len(shards.users)} user files under {shards.directory} "
+              f"(the original is kept as {shards.imported_filename})")
+
+if __name__ == "__main__":
+    main()
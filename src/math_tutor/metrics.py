@@ -0,0 +1,130 @@
+"""
+Lightweight timers and counters for the game pipeline.
+
+Timings are always collected (a perf_counter call per block). They are written
+out at the end of a session when the MATH_TUTOR_METRICS environment variable
+names a file: a ".prom" or ".txt" file gets Prometheus text format, anything
+else gets JSON. Setting MATH_TUTOR_PROFILE to a file name also runs the session
+under cProfile and saves the stats there (read them with pstats or snakeviz).
+"""
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict
+
+METRICS_ENV = 'MATH_TUTOR_METRICS'
+PROFILE_ENV = 'MATH_TUTOR_PROFILE'
+
+_timers = {}  # name -> [count, total seconds, max seconds]
+_counters = {}  # name -> value
+_lock = threading.Lock()  # timers and counters are also updated from prefetch threads
+
+
+@contextmanager
+def timer(name: str):
+    """Time the enclosed block under the given name."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            stats = _timers.get(name)
+            if stats is None:
+                _timers[name] = [1, elapsed, elapsed]
+            else:
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] = max(stats[2], elapsed)
+
+
+def timed(name: str):
+    """Decorator form of timer()."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name: str, value: int = 1):
+    """Increment a named counter."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def snapshot() -> Dict:
+    """Return the current timers and counters as plain data."""
+    with _lock:
+        timers = sorted((name, tuple(stats)) for name, stats in _timers.items())
+        counters = dict(sorted(_counters.items()))
+    return {
+        'timers': {
+            name: {'count': n, 'total_seconds': total, 'mean_seconds': total / n, 'max_seconds': longest}
+            for name, (n, total, longest) in timers
+        },
+        'counters': counters,
+    }
+
+
+def to_json() -> str:
+    return json.dumps(snapshot(), indent=4)
+
+
+def to_prometheus() -> str:
+    """Render the metrics in the Prometheus text exposition format."""
+    current = snapshot()
+    lines = ['# TYPE math_tutor_timer_seconds summary']
+    for name, stats in current['timers'].items():
+        lines.append(f'math_tutor_timer_seconds_count{{name="{name}"}} {stats["count"]}')
+        lines.append(f'math_tutor_timer_seconds_sum{{name="{name}"}} {stats["total_seconds"]:.6f}')
+    lines.append('# TYPE math_tutor_timer_max_seconds gauge')
+    for name, stats in current['timers'].items():
+        lines.append(f'math_tutor_timer_max_seconds{{name="{name}"}} {stats["max_seconds"]:.6f}')
+    lines.append('# TYPE math_tutor_events_total counter')
+    for name, value in current['counters'].items():
+        lines.append(f'math_tutor_events_total{{name="{name}"}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def write(filename: str):
+    """Write the metrics to a file, choosing the format from its extension."""
+    text = to_prometheus() if filename.endswith(('.prom', '.txt')) else to_json()
+    with open(filename, 'w') as file:
+        file.write(text)
+
+
+def session(func):
+    """
+    Wrap a CLI entry point so the run is timed as a whole, optionally profiled
+    with cProfile (MATH_TUTOR_PROFILE) and its metrics written at the end
+    (MATH_TUTOR_METRICS).
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        profile_file = os.environ.get(PROFILE_ENV)
+        profiler = cProfile.Profile() if profile_file else None
+        try:
+            with timer(f'session.{func.__module__}.{func.__name__}'):
+                if profiler is None:
+                    return func(*args, **kwargs)
+                return profiler.runcall(func, *args, **kwargs)
+        finally:
+            if profiler is not None:
+                profiler.dump_stats(profile_file)
+            metrics_file = os.environ.get(METRICS_ENV)
+            if metrics_file:
+                write(metrics_file)
+    return wrapper
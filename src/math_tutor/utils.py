@@ -1,4 +1,12 @@
 import time
+import codecs
+import json
+import queue
+import re
+import threading
+from typing import Dict, Iterable, Iterator, Tuple
+
+_SEPARATORS = re.compile(r'[ \t\r\n\[\],]*')  # what may come between records
 
 def timeit_decorator(func):
     def wrapper(*args, **kwargs):
@@ -8,3 +16,94 @@ def timeit_decorator(func):
         duration = end_time - start_time  # Calculate duration
         return result, duration  # Return result and duration as a tuple
     return wrapper
+
+def iter_json_records(filename: str, chunk_size: int = 65536, offset: int = 0) -> Iterator[Dict]:
+    """
+    Stream records one at a time from a JSON array file (or a JSON lines file).
+
+    Only one chunk of the file is held in memory at a time, so arbitrarily
+    large histories can be scanned in constant memory.
+    """
+    return (record for record, _ in scan_json_records(filename, chunk_size, offset))
+
+def scan_json_records(filename: str, chunk_size: int = 65536, offset: int = 0) -> Iterator[Tuple[Dict, int]]:
+    """
+    Stream (record, end_offset) pairs from a JSON array file, starting at a byte offset.
+
+    end_offset is the byte position just past each record, so a reader can
+    remember where it stopped and later resume from there.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    with open(filename, 'rb') as file:
+        file.seek(offset)
+        buffer = ''
+        ascii = True  # then characters and bytes line up and offsets need no encoding
+        idx = 0  # where parsing resumes in buffer; the consumed text is only dropped on a refill
+        position = offset  # byte offset of buffer[idx]
+        eof = False
+        while True:
+            # Skip separators between records
+            start, idx = idx, _SEPARATORS.match(buffer, idx).end()
+            position += idx - start  # separators are ASCII, one byte each
+            if idx < len(buffer):
+                try:
+                    record, end = decoder.raw_decode(buffer, idx)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    position += end - idx if ascii else len(buffer[idx:end].encode('utf-8'))
+                    idx = end
+                    yield record, position
+                    continue
+            elif eof:
+                return
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[idx:] + text_decoder.decode(chunk, final=eof)
+            ascii = buffer.isascii()
+            idx = 0
+
+def prefetch(iterable: Iterable, depth: int = 2) -> Iterator:
+    """
+    Iterate over iterable in a background thread, keeping up to depth items ready.
+
+    Items are handed over through a bounded queue, so the producer never runs more
+    than depth items ahead. An exception raised by the producer is re-raised where
+    the item would have been consumed, and the producer stops once the consumer does.
+    """
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except BaseException as error:
+            put((done, error))
+        else:
+            put((done, None))
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
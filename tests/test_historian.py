@@ -0,0 +1,130 @@
+import json
+from math_tutor.data import Performance, Problem, structure_record
+from math_tutor.logs.historian import Historian
+from math_tutor.logs.journal import append_json_record, write_json_records
+from math_tutor.logs.leaderboard import Leaderboard
+
+
+def performance(problem, correct=True, user='Ada'):
+    return Performance(correct, 1.5, 0, problem, user)
+
+
+def test_structure_record_upgrades_legacy_record():
+    legacy = {'user': 'Ada', 'correct': True, 'problem': '7 x 8'}
+    record = structure_record(legacy)
+    assert record is legacy
+    assert (record['op'], record['a'], record['b']) == ('x', 7, 8)
+    assert record['problem_id'] == Problem('x', 7, 8).id
+
+
+def test_structure_record_keeps_structured_record():
+    record = {'user': 'Ada', 'correct': True, 'problem': '7 x 8', 'op': '+', 'a': 1, 'b': 2, 'problem_id': 5}
+    assert structure_record(dict(record)) == record
+
+
+def test_legacy_history_file_is_upgraded_on_load(tmp_path):
+    path = str(tmp_path / 'history.json')
+    with open(path, 'w') as file:
+        json.dump([{'user': 'Ada', 'correct': False, 'problem': '6 + 9', 'timestamp': '2024-01-02T10:00:00'}],
+                  file, indent=4)
+    historian = Historian(path)
+    assert historian.history[0]['problem_id'] == Problem('+', 6, 9).id
+    assert historian.problem_outcomes('Ada') == {Problem('+', 6, 9).id: [0, 1]}
+
+
+def test_add_entries_appends_to_file(tmp_path):
+    path = str(tmp_path / 'history.json')
+    historian = Historian(path)
+    historian.add_entry(performance('7 x 8'))
+    assert historian.add_entries([performance('3 + 4'), performance('9 - 2', correct=False)]) == 2
+    with open(path) as file:
+        assert [record['problem'] for record in json.load(file)] == ['7 x 8', '3 + 4', '9 - 2']
+    assert historian.aggregates.count == 3
+
+
+def test_refresh_picks_up_external_append(tmp_path):
+    path = str(tmp_path / 'history.json')
+    reader = Historian(path)
+    writer = Historian(path)
+    writer.add_entry(performance('7 x 8'))
+    assert reader.refresh() == 1
+    assert reader.refresh() == 0  # size and mtime unchanged, nothing read
+    append_json_record(path, Historian.make_record(performance('6 x 7', correct=False)))
+    assert reader.refresh() == 1
+    assert [record['problem'] for record in reader.history] == ['7 x 8', '6 x 7']
+    assert reader.problem_outcomes('Ada')[Problem('x', 6, 7).id] == [0, 1]
+
+
+def test_refresh_reloads_rewritten_file(tmp_path):
+    path = str(tmp_path / 'history.json')
+    historian = Historian(path)
+    historian.add_entries([performance('7 x 8'), performance('6 x 7')])
+    write_json_records(path, [Historian.make_record(performance('2 + 2', user='Grace'))])
+    assert historian.refresh() == 1
+    assert historian.users == ['Grace']
+
+
+def test_snapshot_mode_replays_tail(tmp_path):
+    path = str(tmp_path / 'history.json')
+    Historian(path).add_entries([performance('7 x 8'), performance('6 x 7')])
+    Historian(path, snapshot=True).save_snapshot()
+    Historian(path).add_entry(performance('3 + 4', correct=False))
+    historian = Historian(path, snapshot=True)
+    assert historian.aggregates.count == 3
+    assert historian.history == []
+    assert historian.aggregates.to_dict() == Historian(path).aggregates.to_dict()
+
+
+def test_snapshot_mode_rebuilds_from_stale_snapshot(tmp_path):
+    path = str(tmp_path / 'history.json')
+    Historian(path).add_entries([performance('7 x 8'), performance('6 x 7')])
+    Historian(path, snapshot=True).save_snapshot()
+    # Rewritten with other records, so the bytes before the snapshot offset no longer match its anchor
+    write_json_records(path, [Historian.make_record(performance('9 x 9', user='Grace'))] * 3)
+    historian = Historian(path, snapshot=True)
+    assert historian.aggregates.count == 3
+    assert set(historian.aggregates.outcomes) == {'Grace'}
+
+
+def test_snapshot_mode_save_keeps_file(tmp_path):
+    path = str(tmp_path / 'history.json')
+    Historian(path).add_entries([performance('7 x 8'), performance('6 x 7')])
+    Historian(path, snapshot=True).save()
+    Historian(path, max_history=1).save()
+    assert len(Historian(path).history) == 2
+
+
+def test_leaderboard_refresh_picks_up_external_append(tmp_path):
+    path = str(tmp_path / 'leaders.json')
+    reader = Leaderboard(path)
+    Leaderboard(path).add_entry('Ada', 12, 5, 'multiplication (x)')
+    assert reader.refresh() == 1
+    assert reader.refresh() == 0
+    Leaderboard(path).add_entry('Grace', 7, 3, 'addition (+)')
+    assert reader.refresh() == 1
+    assert [entry.user for entry in reader.leaderboard_data] == ['Ada', 'Grace']
+    assert reader.aggregates.totals == {'Ada': 12, 'Grace': 7}
+
+
+def test_division_levels_follow_divisor_and_quotient(tmp_path):
+    path = str(tmp_path / 'history.json')
+    historian = Historian(path)
+    historian.add_entries(performance(f'{a * b} / {b}') for a in range(2, 13) for b in range(2, 13))
+    card = historian.report_card('Ada')['/']
+    assert sorted(card) == list(range(2, 13))
+    assert card[8]['count'] == 13  # quotient or divisor 8, the other one from 2 to 8
+    assert historian.suggest_level('Ada', '/') == 13  # every level up to 12 mastered
+
+
+def test_historian_survives_torn_append(tmp_path):
+    path = str(tmp_path / 'history.json')
+    Historian(path).add_entries([performance('7 x 8'), performance('6 x 7', user='Grace')])
+    with open(path, 'rb') as file:
+        data = file.read()
+    with open(path, 'wb') as file:
+        file.write(data[:data.rfind(b'"user"') + 5])  # the process died part way through the last record
+    historian = Historian(path)
+    assert historian.users == ['Ada']
+    historian.add_entry(performance('3 + 4', user='Grace'))
+    assert [record['problem'] for record in Historian(path).history] == ['7 x 8', '3 + 4']
+    assert historian.aggregates.count == 2
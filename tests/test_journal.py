@@ -0,0 +1,143 @@
+import json
+import pytest
+from math_tutor.logs.journal import (append_json_record, append_json_records, journal_signature, load_snapshot,
+                                     read_json_records, records_end, save_snapshot, write_json_records)
+
+
+def read_bytes(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+def test_append_creates_file(tmp_path):
+    path = str(tmp_path / 'history.json')
+    end = append_json_record(path, {'n': 1})
+    data = read_bytes(path)
+    assert json.loads(data) == [{'n': 1}]
+    assert end == records_end(data)
+
+
+def test_append_matches_json_dump_layout(tmp_path):
+    path = str(tmp_path / 'history.json')
+    records = [{'n': 1, 'user': 'Ada'}, {'n': 2, 'user': 'Grace'}]
+    for record in records:
+        append_json_record(path, record)
+    assert read_bytes(path).decode('utf-8') == json.dumps(records, indent=4)
+
+
+def test_append_keeps_earlier_bytes(tmp_path):
+    path = str(tmp_path / 'history.json')
+    with open(path, 'w') as file:
+        json.dump([{'n': 1}], file, indent=4)
+    before = read_bytes(path)
+    end = append_json_record(path, {'n': 2})
+    data = read_bytes(path)
+    assert data[:records_end(before)] == before[:records_end(before)]
+    assert json.loads(data) == [{'n': 1}, {'n': 2}]
+    assert end == records_end(data)
+
+
+def test_append_to_empty_array(tmp_path):
+    path = str(tmp_path / 'history.json')
+    with open(path, 'w') as file:
+        file.write('[]')
+    append_json_record(path, {'n': 1})
+    assert json.loads(read_bytes(path)) == [{'n': 1}]
+
+
+def test_append_many_records(tmp_path):
+    path = str(tmp_path / 'history.json')
+    append_json_record(path, {'n': 0})
+    end = append_json_records(path, [{'n': 1}, {'n': 2}])
+    data = read_bytes(path)
+    assert [record['n'] for record in json.loads(data)] == [0, 1, 2]
+    assert end == records_end(data)
+
+
+def test_append_nothing_returns_current_end(tmp_path):
+    path = str(tmp_path / 'history.json')
+    assert append_json_records(path, []) == 0
+    end = append_json_record(path, {'n': 1})
+    assert append_json_records(path, []) == end
+    assert json.loads(read_bytes(path)) == [{'n': 1}]
+
+
+def tear_last_record(path):
+    """Cut the file part way through its last record, as if the process died mid-append."""
+    data = read_bytes(path)
+    with open(path, 'wb') as file:
+        file.write(data[:data.rfind(b'"user"') + 5])
+
+
+def test_append_recovers_from_torn_append(tmp_path):
+    path = str(tmp_path / 'history.json')
+    append_json_records(path, [{'n': 1, 'user': 'Ada'}, {'n': 2, 'user': 'Grace', 'answer': [4, {'x': 5}]}])
+    append_json_record(path, {'n': 3, 'user': 'Alan'})
+    tear_last_record(path)
+    records, end = read_json_records(path)
+    assert [record['n'] for record in records] == [1, 2]
+    assert read_bytes(path)[:end].endswith(b'\n    }')
+    end = append_json_record(path, {'n': 4, 'user': 'Ada'})
+    data = read_bytes(path)
+    assert [record['n'] for record in json.loads(data)] == [1, 2, 4]
+    assert end == records_end(data)
+
+
+def test_append_recovers_from_torn_first_record(tmp_path):
+    path = str(tmp_path / 'history.json')
+    append_json_record(path, {'n': 1, 'user': 'Ada'})
+    tear_last_record(path)
+    assert read_json_records(path) == ([], 0)
+    append_json_record(path, {'n': 2, 'user': 'Ada'})
+    assert json.loads(read_bytes(path)) == [{'n': 2, 'user': 'Ada'}]
+
+
+def test_append_refuses_other_files(tmp_path):
+    path = str(tmp_path / 'history.json')
+    with open(path, 'w') as file:
+        file.write('not json')
+    with pytest.raises(ValueError):
+        append_json_record(path, {'n': 1})
+
+
+def test_signature_changes_on_append(tmp_path):
+    path = str(tmp_path / 'history.json')
+    assert journal_signature(path) is None
+    append_json_record(path, {'n': 1})
+    signature = journal_signature(path)
+    assert journal_signature(path) == signature
+    append_json_record(path, {'n': 2})
+    assert journal_signature(path) != signature
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / 'history.json')
+    end = append_json_records(path, [{'n': 1}, {'n': 2}])
+    save_snapshot(path, {'total': 3}, end, 2)
+    append_json_record(path, {'n': 3})  # appending past the offset keeps the snapshot valid
+    snapshot = load_snapshot(path)
+    assert snapshot['state'] == {'total': 3}
+    assert (snapshot['offset'], snapshot['count']) == (end, 2)
+
+
+def test_snapshot_with_mismatched_anchor_is_stale(tmp_path):
+    path = str(tmp_path / 'history.json')
+    end = append_json_records(path, [{'n': 1}, {'n': 2}])
+    save_snapshot(path, {'total': 3}, end, 2)
+    write_json_records(path, [{'n': 7}, {'n': 8}])  # same length, different bytes before the offset
+    assert len(read_bytes(path)) >= end
+    assert load_snapshot(path) is None
+
+
+def test_snapshot_past_truncated_file_is_stale(tmp_path):
+    path = str(tmp_path / 'history.json')
+    end = append_json_records(path, [{'n': 1}, {'n': 2}])
+    save_snapshot(path, {'total': 3}, end, 2)
+    write_json_records(path, [])
+    assert load_snapshot(path) is None
+
+
+def test_missing_snapshot(tmp_path):
+    path = str(tmp_path / 'history.json')
+    append_json_record(path, {'n': 1})
+    assert load_snapshot(path) is None
@@ -0,0 +1,87 @@
+import random
+import pytest
+from math_tutor.data import LeaderboardEntry
+from math_tutor.logs.leaderboard import Leaderboard, RankIndex
+
+GAMES = [
+    ('Ada', 12, 'multiplication (x)'),
+    ('Grace', 20, 'addition (+)'),
+    ('Ada', 20, 'addition (+)'),
+    ('Alan', 5, 'multiplication (x)'),
+    ('Grace', 12, 'multiplication (x)'),
+    ('Ada', 3, 'addition (+)'),
+]
+
+
+def entry(user, feathers, fact_type='addition (+)', n=0):
+    return LeaderboardEntry.from_dict({'user': user, 'feathers': feathers, 'level': 5, 'fact_type': fact_type,
+                                       'timestamp': f'2024-03-01T10:00:{n % 60:02d}'})
+
+
+def expected_rank(scores, feathers):
+    return sum(score > feathers for score in scores) + 1
+
+
+@pytest.mark.parametrize('block_size', [1, 2, 3, 512])
+def test_rank_index_matches_sorting(monkeypatch, block_size):
+    monkeypatch.setattr(RankIndex, 'block_size', block_size)
+    rng = random.Random(7)
+    initial = [entry(f'u{n}', rng.randint(0, 30), n=n) for n in range(40)]
+    index = RankIndex(initial)
+    added = []
+    for n in range(200):
+        added.append(entry(f'v{n}', rng.randint(0, 30), n=n))
+        index.add(added[-1])
+    every = initial + added
+    # Descending by feathers, ties in insertion order (sorted() is stable)
+    assert index.top() == sorted(every, key=lambda e: e.feathers, reverse=True)
+    assert index.top(7) == index.top()[:7]
+    assert len(index) == len(every)
+    scores = [e.feathers for e in every]
+    for feathers in range(-1, 33):
+        assert index.rank_of(feathers) == expected_rank(scores, feathers)
+
+
+def test_empty_rank_index():
+    index = RankIndex()
+    assert (index.top(3), index.rank_of(10), len(index)) == ([], 1, 0)
+    index.add(entry('Ada', 4))
+    assert (index.rank_of(5), index.rank_of(4), index.rank_of(3)) == (1, 1, 2)
+
+
+@pytest.fixture
+def board(tmp_path):
+    board = Leaderboard(str(tmp_path / 'leaders.json'))
+    for user, feathers, fact_type in GAMES:
+        board.add_entry(user, feathers, 5, fact_type)
+    return board
+
+
+def test_rank_and_top_in_each_scope(board):
+    assert [(e.user, e.feathers) for e in board.top(3)] == [('Grace', 20), ('Ada', 20), ('Ada', 12)]
+    assert board.rank_of(20) == 1  # ties share a rank
+    assert board.rank_of(12) == 3
+    assert board.rank_of(13) == 3
+    assert board.rank_of(0) == 7
+    assert [e.feathers for e in board.top(user='Ada')] == [20, 12, 3]
+    assert board.rank_of(12, user='Ada') == 2
+    assert [e.user for e in board.top(fact_type='multiplication (x)')] == ['Ada', 'Grace', 'Alan']
+    assert board.rank_of(12, fact_type='multiplication (x)') == 1
+    assert board.rank_of(6, fact_type='multiplication (x)') == 3
+    assert [e.feathers for e in board.top(user='Ada', fact_type='addition (+)')] == [20, 3]
+    assert board.rank_of(4, user='Ada', fact_type='addition (+)') == 2
+    assert board.top(user='Nobody') == [] and board.rank_of(5, user='Nobody') == 1
+
+
+def test_entries_added_after_indexes_are_built(board):
+    assert board.rank_of(15) == 3  # builds the indexes
+    indexes = board._indexes
+    board.add_entry('Alan', 15, 5, 'multiplication (x)')
+    board.add_entry('Katherine', 25, 5, 'division (/)')
+    assert board._indexes is indexes  # updated in place, not rebuilt
+    assert board.rank_of(15) == 4
+    assert [e.user for e in board.top(2)] == ['Katherine', 'Grace']
+    assert board.rank_of(15, user='Alan') == 1
+    assert board.rank_of(14, fact_type='multiplication (x)') == 2
+    assert [e.user for e in board.top(fact_type='division (/)')] == ['Katherine']
+    assert board.top() == board.top(100) == sorted(board.leaderboard_data, key=lambda e: e.feathers, reverse=True)
@@ -0,0 +1,79 @@
+import json
+import sys
+import pytest
+from math_tutor.cli import merge_logs
+from math_tutor.logs.journal import write_json_records
+from math_tutor.logs.shards import ShardDirectory
+
+
+def record(user, minute, problem='7 x 8'):
+    return {'user': user, 'problem': problem, 'correct': True, 'timestamp': f'2024-03-01T10:{minute:02d}:00'}
+
+
+def read_json(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def run(monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ['merge_logs', *args])
+    merge_logs.main()
+
+
+def test_merge_records_orders_across_inputs_and_drops_duplicates(tmp_path):
+    first, second, third = (str(tmp_path / f'{name}.json') for name in ('first', 'second', 'third'))
+    write_json_records(first, [record('Ada', 1), record('Ada', 4), record('Ada', 9)])
+    write_json_records(second, [record('Grace', 2), record('Ada', 4), record('Grace', 4), record('Grace', 8)])
+    write_json_records(third, [record('Alan', 3), record('Ada', 4, problem='6 x 7')])
+    stats = {'read': 0, 'duplicates': 0, 'out_of_order': 0}
+    merged = list(merge_logs.merge_records([first, second, third, str(tmp_path / 'missing.json')], stats))
+    assert [entry['timestamp'][-5:-3] for entry in merged] == ['01', '02', '03', '04', '04', '04', '08', '09']
+    assert sorted((entry['user'], entry['problem']) for entry in merged if entry['timestamp'].endswith('04:00')) == [
+        ('Ada', '6 x 7'), ('Ada', '7 x 8'), ('Grace', '7 x 8')]
+    assert stats == {'read': 9, 'duplicates': 1, 'out_of_order': 0}
+
+
+def test_merge_records_counts_out_of_order_input(tmp_path):
+    path = str(tmp_path / 'history.json')
+    write_json_records(path, [record('Ada', 5), record('Ada', 2)])
+    stats = {'read': 0, 'duplicates': 0, 'out_of_order': 0}
+    assert len(list(merge_logs.merge_records([path], stats))) == 2
+    assert stats['out_of_order'] == 1
+
+
+def test_main_keeps_records_already_in_output(tmp_path, monkeypatch, capsys):
+    output, laptop = str(tmp_path / 'history.json'), str(tmp_path / 'laptop.json')
+    write_json_records(output, [record('Ada', 1), record('Ada', 5)])
+    write_json_records(laptop, [record('Grace', 3), record('Ada', 5)])
+    run(monkeypatch, laptop, '-o', output)
+    assert [entry['timestamp'][-5:-3] for entry in read_json(output)] == ['01', '03', '05']
+    assert "from 2 files" in capsys.readouterr().out
+
+
+def test_main_counts_only_files_that_exist(tmp_path, monkeypatch, capsys):
+    output = str(tmp_path / 'history.json')
+    first, second = str(tmp_path / 'first.json'), str(tmp_path / 'second.json')
+    write_json_records(first, [record('Ada', 1)])
+    write_json_records(second, [record('Grace', 2)])
+    run(monkeypatch, first, second, str(tmp_path / 'missing.json'), '-o', output)
+    out = capsys.readouterr().out
+    assert "missing.json not found" in out
+    assert "Merged 2 records from 2 files" in out
+    assert [entry['user'] for entry in read_json(output)] == ['Ada', 'Grace']
+
+
+def test_main_reads_output_listed_as_input_once(tmp_path, monkeypatch, capsys):
+    output = str(tmp_path / 'history.json')
+    write_json_records(output, [record('Ada', 1)])
+    run(monkeypatch, output, '-o', output)
+    assert "Merged 1 records from 1 files" in capsys.readouterr().out
+    assert read_json(output) == [record('Ada', 1)]
+
+
+def test_main_refuses_sharded_output(tmp_path, monkeypatch):
+    output, laptop = str(tmp_path / 'history.json'), str(tmp_path / 'laptop.json')
+    write_json_records(output, [record('Ada', 1)])
+    write_json_records(laptop, [record('Grace', 2)])
+    ShardDirectory(output).import_file()
+    with pytest.raises(SystemExit):
+        run(monkeypatch, laptop, '-o', output)
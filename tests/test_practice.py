@@ -0,0 +1,64 @@
+import random
+from collections import Counter
+import pytest
+from math_tutor.core.practice import AliasTable, WeightedSampler
+
+DRAWS = 40000
+
+
+def frequencies(draw, n, draws=DRAWS):
+    counts = Counter(draw() for _ in range(draws))
+    return [counts[i] / draws for i in range(n)]
+
+
+def assert_close(observed, weights, tolerance=0.015):
+    total = sum(weights)
+    for index, (frequency, weight) in enumerate(zip(observed, weights)):
+        assert frequency == pytest.approx(weight / total, abs=tolerance), index
+        if weight == 0:
+            assert frequency == 0, index
+
+
+def test_alias_table_distribution():
+    weights = [1, 0, 3, 6, 0.5, 9.5]
+    table = AliasTable(weights)
+    rng = random.Random(1)
+    assert_close(frequencies(lambda: table.draw(rng), len(weights)), weights)
+
+
+def test_alias_table_without_weight_is_uniform():
+    table = AliasTable([0, 0, 0, 0])
+    rng = random.Random(2)
+    assert_close(frequencies(lambda: table.draw(rng), 4), [1, 1, 1, 1])
+
+
+def test_sampler_distribution_across_blocks():
+    weights = [1, 2, 3, 4, 0, 0, 0, 0, 5, 5, 10]  # the middle block has no weight at all
+    sampler = WeightedSampler(weights, block_size=4)
+    rng = random.Random(3)
+    assert_close(frequencies(lambda: sampler.draw(rng), len(weights)), weights)
+
+
+def test_sampler_update_rebuilds_only_changed_blocks():
+    weights = [1.0] * 12
+    sampler = WeightedSampler(weights, block_size=4)
+    untouched = sampler._blocks[2]
+    for index in range(4):
+        sampler.update(index, 0)  # empties the first block
+    sampler.update(5, 9.0)
+    sampler.update(9, 1.0)  # unchanged weight, nothing to rebuild
+    assert sampler._dirty == {0, 1}
+    expected = [0, 0, 0, 0, 1, 9, 1, 1, 1, 1, 1, 1]
+    rng = random.Random(4)
+    assert_close(frequencies(lambda: sampler.draw(rng), len(expected)), expected)
+    assert sampler._blocks[2] is untouched
+    assert not sampler._dirty
+
+    sampler.update(2, 8.0)  # the emptied block gets weight back
+    expected[2] = 8.0
+    assert_close(frequencies(lambda: sampler.draw(rng), len(expected)), expected)
+
+
+def test_empty_sampler():
+    with pytest.raises(IndexError):
+        WeightedSampler([]).draw()
@@ -0,0 +1,145 @@
+import json
+import os
+import pytest
+from math_tutor.data import Performance, Problem
+from math_tutor.logs.historian import Historian
+from math_tutor.logs.leaderboard import Leaderboard
+from math_tutor.logs.shards import ShardDirectory, ShardedHistorian, ShardedLeaderboard, open_historian, open_leaderboard
+
+
+def performance(problem, user, correct=True):
+    return Performance(correct, 1.5, 0, problem, user)
+
+
+@pytest.fixture
+def history(tmp_path):
+    path = str(tmp_path / 'history.json')
+    Historian(path).add_entries([performance('7 x 8', 'Ada'), performance('3 + 4', 'Grace'),
+                                 performance('6 x 7', 'Ada', correct=False)])
+    return path
+
+
+@pytest.fixture
+def leaders(tmp_path):
+    path = str(tmp_path / 'egghunt_leaders.json')
+    board = Leaderboard(path)
+    board.add_entry('Ada', 12, 5, 'multiplication (x)')
+    board.add_entry('Grace', 20, 4, 'addition (+)')
+    board.add_entry('Ada', 8, 5, 'addition (+)')
+    return path
+
+
+def read_json(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def test_import_splits_records_by_user(history):
+    shards = ShardDirectory(history)
+    assert shards.import_file() == 3
+    assert sorted(shards.users) == ['Ada', 'Grace']
+    assert read_json(shards.index_filename) == {'users': shards.index}
+    assert [record['problem'] for record in shards.iter_records('Ada')] == ['7 x 8', '6 x 7']
+    assert [record['problem'] for record in shards.iter_records('Grace')] == ['3 + 4']
+    assert not os.path.exists(history)  # moved aside, so nothing keeps writing to it
+    assert len(read_json(shards.imported_filename)) == 3
+    assert ShardDirectory.exists_for(history)
+
+
+def test_import_refuses_sharded_log(history):
+    ShardDirectory(history).import_file()
+    with pytest.raises(ValueError):
+        ShardDirectory(history).import_file(ShardDirectory(history).imported_filename)
+
+
+def test_import_replaces_leftovers_of_interrupted_import(history):
+    shards = ShardDirectory(history)
+    os.makedirs(os.path.join(shards.directory, 'stale'))
+    os.makedirs(shards.directory + '.tmp')
+    assert shards.import_file() == 3
+    assert sorted(os.listdir(shards.directory)) == sorted(list(shards.index.values()) + ['index.json'])
+    assert not os.path.exists(shards.directory + '.tmp')
+
+
+def test_unknown_user_has_no_shard(history):
+    shards = ShardDirectory(history)
+    shards.import_file()
+    assert shards.shard_filename('Alan') is None
+    assert list(shards.iter_records('Alan')) == []
+
+
+def test_open_uses_shards_once_imported(history, leaders):
+    assert type(open_historian(history, shared=False)) is Historian
+    ShardDirectory(history).import_file()
+    ShardDirectory(leaders).import_file()
+    assert type(open_historian(history, shared=False)) is ShardedHistorian
+    assert type(open_leaderboard(leaders, shared=False)) is ShardedLeaderboard
+
+
+def test_sharded_historian_reads_one_user(history):
+    ShardDirectory(history).import_file()
+    historian = ShardedHistorian(history)
+    assert historian.problem_outcomes('Ada') == {Problem('x', 7, 8).id: [1, 0], Problem('x', 6, 7).id: [0, 1]}
+    assert list(historian._historians) == ['Ada']  # Grace's shard was not read
+    assert historian.report_card('Grace')['+'][4] == {'rate': 1.0, 'count': 1}
+    assert historian.query().user('Ada').count() == 2
+
+
+def test_sharded_historian_adds_new_user(history):
+    ShardDirectory(history).import_file()
+    historian = ShardedHistorian(history, snapshot=True)
+    historian.add_entries([performance('9 - 2', 'Alan'), performance('9 - 3', 'Alan')])
+    assert 'Alan' in ShardDirectory(history).users
+    assert [record['problem'] for record in ShardDirectory(history).iter_records('Alan')] == ['9 - 2', '9 - 3']
+    assert sum(historian.problem_outcomes('Alan')[Problem('-', 9, b).id][0] for b in (2, 3)) == 2
+    historian.save()  # nothing to rewrite in snapshot mode; must not empty the shards
+    assert len(list(ShardDirectory(history).iter_records())) == 5
+
+
+def test_sharded_historian_refresh(history):
+    ShardDirectory(history).import_file()
+    reader = ShardedHistorian(history)
+    assert reader.problem_outcomes('Ada')[Problem('x', 7, 8).id] == [1, 0]
+    writer = ShardedHistorian(history)
+    writer.add_entry(performance('7 x 8', 'Ada'))
+    writer.add_entry(performance('5 + 5', 'Alan'))
+    assert reader.refresh() == 1
+    assert reader.problem_outcomes('Ada')[Problem('x', 7, 8).id] == [2, 0]
+    assert 'Alan' in reader.users
+    assert reader.problem_outcomes('Alan') == {Problem('+', 5, 5).id: [1, 0]}
+
+
+def test_sharded_leaderboard_per_user_views(leaders):
+    ShardDirectory(leaders).import_file()
+    board = ShardedLeaderboard(leaders)
+    assert [entry.feathers for entry in board.top(5, user='Ada')] == [12, 8]
+    assert board.rank_of(10, user='Ada') == 2
+    assert [entry.user for entry in board.top(5)] == ['Grace', 'Ada', 'Ada']
+    assert board.rank_of(15) == 2
+    assert {leader['user']: leader['total_points'] for leader in board.get_all_time_leaders()} == {'Ada': 20, 'Grace': 20}
+
+
+def test_sharded_leaderboard_adds_new_user(leaders):
+    ShardDirectory(leaders).import_file()
+    board = ShardedLeaderboard(leaders, snapshot=True)
+    assert board.rank_of(15) == 2  # builds the combined indexes
+    board.add_entry('Alan', 16, 3, 'addition (+)')
+    assert board.rank_of(15) == 3
+    assert board.rank_of(16, fact_type='addition (+)') == 2
+    assert [entry.user for entry in board.top(2)] == ['Grace', 'Alan']
+    assert 'Alan' in ShardDirectory(leaders).users
+    board.save()
+    assert len(list(ShardDirectory(leaders).iter_records())) == 4
+
+
+def test_sharded_leaderboard_refresh(leaders):
+    ShardDirectory(leaders).import_file()
+    reader = ShardedLeaderboard(leaders)
+    assert reader.rank_of(10, user='Ada') == 2
+    writer = ShardedLeaderboard(leaders)
+    writer.add_entry('Ada', 30, 5, 'multiplication (x)')
+    writer.add_entry('Alan', 1, 2, 'addition (+)')
+    assert reader.refresh() == 1  # Ada's shard; Alan's is picked up from the index on use
+    assert reader.rank_of(10, user='Ada') == 3
+    assert reader.rank_of(25) == 2
+    assert sorted(reader.users) == ['Ada', 'Alan', 'Grace']
@@ -0,0 +1,30 @@
+import json
+import pytest
+from math_tutor.utils import iter_json_records, scan_json_records
+
+RECORDS = [{'user': name * n, 'n': n, 'answer': [n, n + 1]} for n in range(1, 40) for name in ('Ada', 'Zoë', '€')]
+
+
+def write_records(path, ensure_ascii=True):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(RECORDS, file, indent=4, ensure_ascii=ensure_ascii)
+
+
+@pytest.mark.parametrize('ensure_ascii', [True, False])
+@pytest.mark.parametrize('chunk_size', [1, 7, 100, 65536])
+def test_scan_offsets_follow_each_record(tmp_path, chunk_size, ensure_ascii):
+    path = str(tmp_path / 'history.json')
+    write_records(path, ensure_ascii)
+    with open(path, 'rb') as file:
+        data = file.read()
+    scanned = list(scan_json_records(path, chunk_size=chunk_size))
+    assert [record for record, _ in scanned] == RECORDS
+    for record, end in scanned:
+        assert data[:end].endswith(json.dumps(record, indent=4, ensure_ascii=ensure_ascii).replace('\n', '\n    ').encode('utf-8'))
+
+
+def test_scan_resumes_from_offset(tmp_path):
+    path = str(tmp_path / 'history.json')
+    write_records(path, ensure_ascii=False)
+    _, end = list(scan_json_records(path))[9]
+    assert list(iter_json_records(path, chunk_size=5, offset=end)) == RECORDS[10:]